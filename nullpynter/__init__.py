@@ -31,6 +31,29 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-from .remote import Remote
-from .shorten import Shorten
-from .upload import Upload
+import importlib
+
+# Public names, and the modules they come from. These are imported on first
+# use so that importing the package (e.g. for the npy command) stays cheap.
+_exports = {
+    'AsyncClient': '.aio',
+    'Remote': '.remote',
+    'Shorten': '.shorten',
+    'Upload': '.upload',
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
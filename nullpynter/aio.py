@@ -0,0 +1,171 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+aio - asyncio client for the service
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .remote import Remote
+from .shorten import Shorten
+from .transport import Transport
+from .upload import Upload
+
+DEFAULT_LIMIT = 8
+
+class AsyncClient:
+    """ An asyncio client for the service.
+
+    This does the same job as Upload, Remote and Shorten, for code running in
+    an event loop:
+
+        async with AsyncClient('http://0x0.st') as client:
+            url = await client.upload('screenshot.png')
+
+    Each request is sent by one of those classes from a pool of worker
+    threads, so it is size checked, rate limited, retried, journaled and
+    recorded in the history and statistics just like a blocking request,
+    without blocking the event loop. The pool has a thread (and a connection
+    to the service) for each request allowed in flight at once.
+
+    Attributes:
+        service_url(str): The URL of the Nullpointer service to use
+        transport(Transport): The transport the requests are sent with
+        retry_policy(RetryPolicy): How to retry requests which fail
+        endpoints(EndpointPool): If set, the services to spread requests over
+            and fail over between, instead of service_url
+        limiter(RequestLimiter): What keeps requests within what the service
+            will take (default is the one shared by the process)
+    """
+
+    def __init__(
+            self,
+            service_url:str = 'http://0x0.st',
+            limit:int = DEFAULT_LIMIT,
+            transport=None,
+            retry_policy=None,
+            endpoints=None,
+            limiter=None
+        ) -> None:
+        """ Class constructor
+
+        Arguments:
+            service_url - The URL of the Nullpointer service to use
+            limit - The maximum number of requests in flight at once
+            transport - The Transport to use (default is a new one with a
+                connection for each request in flight)
+            retry_policy - The RetryPolicy for each request
+            endpoints - An EndpointPool to spread requests over
+            limiter - The RequestLimiter for each request
+        """
+        limit = max(1, limit)
+        self.service_url = service_url
+        self.transport = transport or Transport(maxsize=limit)
+        self._own_transport = not transport
+        self.retry_policy = retry_policy
+        self.endpoints = endpoints
+        self.limiter = limiter
+        self._executor = ThreadPoolExecutor(
+            max_workers=limit, thread_name_prefix='npy-aio'
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def upload(self, path:str) -> str:
+        """ Upload a file to the service.
+
+        Returns:
+            The response from the service (usually the URL or an error)
+
+        Raises:
+            RequestFailed if the request failed on every attempt, or
+            FileTooLarge if the file is larger than the service allows
+        """
+        return await self.send(Upload, path)
+
+    async def remote(self, url:str) -> str:
+        """ Have the service fetch and host a remote file.
+
+        Returns:
+            The response from the service (usually the URL or an error)
+
+        Raises:
+            RequestFailed if the request failed on every attempt
+        """
+        return await self.send(Remote, url)
+
+    async def shorten(self, url:str) -> str:
+        """ Shorten a URL.
+
+        Returns:
+            The response from the service (usually the URL or an error)
+
+        Raises:
+            RequestFailed if the request failed on every attempt
+        """
+        return await self.send(Shorten, url)
+
+    async def send(self, action_class, item:str) -> str:
+        """ Send an item to the service from a worker thread.
+
+        Arguments:
+            action_class - The NullRequest subclass to use (e.g. Upload)
+            item - The item to send
+
+        Returns:
+            The response from the service (usually the URL or an error)
+        """
+        action = action_class(
+            service_url=self.service_url,
+            transport=self.transport,
+            retry_policy=self.retry_policy
+        )
+        action.endpoints = self.endpoints
+        action.limiter = self.limiter
+        action.set_request_params(item)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, action.send_request)
+
+    async def close(self):
+        """ Wait for any requests still being sent, and stop the workers.
+
+        The connections are closed too, unless the transport was given.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        if self._own_transport:
+            self.transport.clear()
@@ -0,0 +1,120 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+batch - send many items to the service concurrently
+"""
+
+from .transport import Transport
+
+# Most requests to have in flight at once. Fewer are used if the service
+# can't keep up with this many (see ratelimit.AdaptiveLimit).
+DEFAULT_JOBS = 16
+
+def read_items(item_file) -> list:
+    """ Read newline-delimited items from a file, skipping blank lines.
+
+    Arguments:
+        item_file - An open text file (e.g. sys.stdin)
+    """
+    return [line.strip() for line in item_file if line.strip()]
+
+def run_batch(
+        action_class,
+        items:list,
+        service_url:str = 'http://0x0.st',
+        jobs:int = DEFAULT_JOBS,
+        ordered:bool = False,
+        transport=None,
+        retry_policy=None,
+        progress_callback=None,
+        endpoints=None,
+        limiter=None
+    ):
+    """ Send a number of items to the service using a pool of workers.
+
+    All of the workers share a single transport, sized so that each of them
+    can keep a connection to the service open. How many of them send at once
+    adapts to how the service copes, so jobs is an upper limit.
+
+    Arguments:
+        action_class - The NullRequest subclass to use (e.g. Upload)
+        items - The items to send
+        service_url - The URL of the Nullpointer service
+        jobs - The maximum number of requests in flight at once
+        ordered - If True, yield results in the order of items; otherwise
+            yield them as they complete.
+        transport - The Transport to use (default is a new one)
+        retry_policy - The RetryPolicy for each request
+        progress_callback - Called with (item, Progress) as each upload is
+            sent
+        endpoints - An EndpointPool to spread the items over instead of
+            service_url
+        limiter - The RequestLimiter for each request (default is the one
+            shared by the process)
+
+    Yields:
+        (item:str, response:str, error:Exception) for each item. Exactly one
+        of response or error is set.
+    """
+    # Imported here since it's comparatively slow, and the npy command only
+    # needs this module's defaults until it actually sends something.
+    #pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    jobs = max(1, jobs)
+    if not transport:
+        transport = Transport(maxsize=jobs)
+
+    def send(item):
+        action = action_class(
+            service_url=service_url,
+            transport=transport,
+            retry_policy=retry_policy
+        )
+        action.endpoints = endpoints
+        action.limiter = limiter
+        if progress_callback:
+            action.progress_callback = (
+                lambda progress: progress_callback(item, progress)
+            )
+        action.set_request_params(item)
+        return action.send_request()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(send, item): item for item in items}
+        results = futures if ordered else as_completed(futures)
+        for future in results:
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as err: #pylint: disable=broad-except
+                yield item, '', err
@@ -0,0 +1,372 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+bench - benchmarks for the request path and the history
+
+Run with `python -m nullpynter.bench`. Results are printed as JSON so that
+runs from different versions can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .__version__ import __version__
+
+MiB = 1024 * 1024
+
+DEFAULT_HISTORY_SIZES = [1000, 10000, 100000]
+DEFAULT_UPLOAD_SIZES = [1 * MiB, 16 * MiB, 128 * MiB]
+LARGE_UPLOAD_SIZES = [512 * MiB, 2048 * MiB]
+DEFAULT_CONCURRENCY = [1, 4, 16]
+
+# How many operations to time for each history benchmark
+HISTORY_OPERATIONS = 1000
+
+# Modules which trivial npy invocations must not import
+HEAVY_MODULES = [
+    'asyncio',
+    'concurrent.futures',
+    'gi',
+    'sqlite3',
+    'ssl',
+    'urllib3',
+]
+
+# Trivial npy invocations, checked by the import_time benchmark
+TRIVIAL_COMMANDS = [
+    ['--help'],
+    ['not-an-action'],
+    ['upload'],
+]
+
+UPLOAD_SCRIPT = """
+import json, resource, sys, time
+from nullpynter.transport import Transport
+from nullpynter.upload import Upload
+upload = Upload(service_url=sys.argv[1], transport=Transport())
+upload.set_request_params(sys.argv[2])
+start = time.perf_counter()
+response = upload.send_request()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'response': response,
+    'seconds': elapsed,
+    'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+def timed(function, repeat:int = 1) -> float:
+    """ Run a function a number of times and return the total seconds taken"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return time.perf_counter() - start
+
+def find_npy() -> str:
+    """ Find the npy command, preferring the one next to this package."""
+    npy = Path(__file__).resolve().parent.parent / 'bin' / 'npy'
+    if npy.is_file():
+        return str(npy)
+    return shutil.which('npy') or ''
+
+def bench_cold_start(runs:int = 10) -> dict:
+    """ Measure the time to start the interpreter and the npy command."""
+    commands = {
+        'python': [sys.executable, '-c', 'pass'],
+        'import_nullpynter': [sys.executable, '-c', 'import nullpynter'],
+    }
+    npy = find_npy()
+    if npy:
+        commands['npy_help'] = [sys.executable, str(npy), '--help']
+
+    results = {}
+    for name, command in commands.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, check=False)
+            times.append(time.perf_counter() - start)
+        results[name] = {
+            'median_seconds': statistics.median(times),
+            'min_seconds': min(times),
+        }
+    return results
+
+def bench_import_time() -> dict:
+    """ Check what trivial npy invocations import, using -X importtime.
+
+    None of them should import any of HEAVY_MODULES; `--check` turns that
+    into a failing exit status.
+    """
+    npy = find_npy()
+    if not npy:
+        raise ImportError('The npy command could not be found')
+
+    results = {}
+    for arguments in TRIVIAL_COMMANDS:
+        run = subprocess.run(
+            [sys.executable, '-X', 'importtime', npy] + arguments,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            check=False
+        )
+        modules = []
+        total = 0
+        for line in run.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line.split('|')
+            modules.append(name.strip())
+            # Nested imports are indented; only count the outermost ones
+            if not name.startswith('  '):
+                total += int(cumulative)
+        heavy = sorted(
+            module for module in modules
+            if module in HEAVY_MODULES or module.split('.')[0] in HEAVY_MODULES
+        )
+        results[' '.join(arguments)] = {
+            'modules': len(modules),
+            'import_microseconds': total,
+            'heavy_modules': heavy,
+        }
+    return results
+
+def bench_request_construction(runs:int = 1000) -> dict:
+    """ Measure the cost of constructing request objects."""
+    from .shorten import Shorten #pylint: disable=import-outside-toplevel
+    Shorten()
+    return {'seconds_per_request': timed(Shorten, runs) / runs}
+
+def bench_history(sizes:list) -> dict:
+    """ Measure history append, lookup and pop at various sizes."""
+    from .history import NpyHistory #pylint: disable=import-outside-toplevel
+    url = 'http://0x0.st'
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            history = NpyHistory(Path(data_dir) / 'history.db')
+            with history._db: #pylint: disable=protected-access
+                history._db.executemany( #pylint: disable=protected-access
+                    'INSERT INTO history (service_url, item, response, name) '
+                    'VALUES (?, ?, ?, ?)',
+                    (
+                        (url, f'item-{i}', f'{url}/{i}', f'item-{i}')
+                        for i in range(size)
+                    )
+                )
+            count = min(HISTORY_OPERATIONS, size)
+
+            def append(counter=iter(range(size, size + count))):
+                i = next(counter)
+                history.append(f'item-{i}', url, f'{url}/{i}')
+
+            def lookup(counter=iter(range(count))):
+                i = next(counter)
+                history.find_item_in_history(url, f'item-{i * (size // count)}')
+
+            def reverse(counter=iter(range(count))):
+                i = next(counter)
+                history.find_response(f'{url}/{i * (size // count)}')
+
+            def pop(counter=iter(range(count))):
+                i = next(counter)
+                history.pop(url, item=f'item-{i * (size // count)}')
+
+            results[str(size)] = {
+                'open_seconds': timed(
+                    lambda: NpyHistory(Path(data_dir) / 'history.db')
+                ),
+                'append_seconds': timed(append, count) / count,
+                'lookup_seconds': timed(lookup, count) / count,
+                'find_response_seconds': timed(reverse, count) / count,
+                'pop_seconds': timed(pop, count) / count,
+            }
+    return results
+
+def bench_upload(sizes:list) -> dict:
+    """ Measure upload throughput and peak memory against a stand-in server.
+
+    Each upload runs in its own process so that its peak RSS can be measured.
+    """
+    import urllib3 #pylint: disable=import-outside-toplevel,unused-import
+    from .testing import spawn #pylint: disable=import-outside-toplevel
+    process, url = spawn(no_store=True, max_size=max(sizes) + MiB)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            block = os.urandom(MiB)
+            for size in sizes:
+                path = Path(data_dir) / f'upload-{size}.bin'
+                with open(path, mode='wb') as upload_file:
+                    for _ in range(size // MiB):
+                        upload_file.write(block)
+                    upload_file.write(block[:size % MiB])
+
+                run = subprocess.run(
+                    [sys.executable, '-c', UPLOAD_SCRIPT, url, str(path)],
+                    capture_output=True, text=True, check=False
+                )
+                path.unlink()
+                if run.returncode:
+                    error = run.stderr.strip().splitlines()[-1:]
+                    results[str(size)] = {'error': ''.join(error)}
+                    continue
+                result = json.loads(run.stdout)
+                results[str(size)] = {
+                    'seconds': result['seconds'],
+                    'mib_per_second': size / MiB / result['seconds'],
+                    'max_rss_kib': result['max_rss_kib'],
+                }
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+def bench_batch_shorten(levels:list, count:int = 200, latency:float = 0.02):
+    """ Measure batch shorten rates at various levels of concurrency."""
+    import urllib3 #pylint: disable=import-outside-toplevel,unused-import
+    from .batch import run_batch #pylint: disable=import-outside-toplevel
+    from .shorten import Shorten #pylint: disable=import-outside-toplevel
+    from .testing import NullpointerServer #pylint: disable=import-outside-toplevel
+    results = {}
+    with NullpointerServer(latency=latency) as server:
+        for jobs in levels:
+            items = [f'http://example.com/{jobs}/{i}' for i in range(count)]
+            start = time.perf_counter()
+            failed = sum(
+                1 for _, _, error in run_batch(
+                    Shorten, items, service_url=server.url, jobs=jobs
+                ) if error
+            )
+            elapsed = time.perf_counter() - start
+            results[str(jobs)] = {
+                'items_per_second': count / elapsed,
+                'failed': failed,
+            }
+    return results
+
+BENCHMARKS = {
+    'cold_start': lambda args: bench_cold_start(),
+    'import_time': lambda args: bench_import_time(),
+    'request_construction': lambda args: bench_request_construction(),
+    'history': lambda args: bench_history(args.history_sizes),
+    'upload': lambda args: bench_upload(args.upload_sizes),
+    'batch_shorten': lambda args: bench_batch_shorten(args.concurrency),
+}
+
+def main(argv:list = None):
+    """ Run the benchmarks and print the results as JSON."""
+    parser = argparse.ArgumentParser(
+        prog='python -m nullpynter.bench',
+        description='Benchmark the nullpynter request path and history'
+    )
+    parser.add_argument(
+        '--only',
+        help=f'Comma-separated benchmarks to run: {", ".join(BENCHMARKS)}'
+    )
+    parser.add_argument(
+        '--history-sizes', type=int, nargs='+', default=DEFAULT_HISTORY_SIZES
+    )
+    parser.add_argument(
+        '--upload-sizes', type=int, nargs='+', default=DEFAULT_UPLOAD_SIZES,
+        help='File sizes to upload, in bytes'
+    )
+    parser.add_argument(
+        '--large', action='store_true',
+        help='Also upload 512 MiB and 2 GiB files'
+    )
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY
+    )
+    parser.add_argument('-o', '--output', help='Write the results to a file')
+    parser.add_argument(
+        '--check', action='store_true',
+        help='Exit with an error if trivial npy commands import heavy modules'
+    )
+    args = parser.parse_args(argv)
+    if args.large:
+        args.upload_sizes += LARGE_UPLOAD_SIZES
+
+    selected = list(BENCHMARKS)
+    if args.only:
+        selected = args.only.split(',')
+
+    # Keep benchmarks away from the real history; subprocesses inherit this.
+    home = tempfile.mkdtemp(prefix='nullpynter-bench-')
+    os.environ['HOME'] = home
+
+    results = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.time(),
+        'benchmarks': {},
+    }
+    try:
+        for name in selected:
+            print(f'Running {name}...', file=sys.stderr)
+            try:
+                results['benchmarks'][name] = BENCHMARKS[name](args)
+            except ImportError as err:
+                results['benchmarks'][name] = {'skipped': str(err)}
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, mode='w') as output_file:
+            output_file.write(output + '\n')
+    print(output)
+
+    if args.check:
+        import_time = results['benchmarks'].get('import_time', {})
+        heavy = {
+            command: result['heavy_modules']
+            for command, result in import_time.items()
+            if result.get('heavy_modules')
+        }
+        if heavy:
+            print(f'FAIL: heavy modules imported: {heavy}', file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
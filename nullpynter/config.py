@@ -0,0 +1,91 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+config - user settings
+"""
+
+import json
+import os
+from pathlib import Path
+
+# Platform-specific config path. This should be relative to the home folder
+CONFIG_PATH = ['.config']
+APP_DIR = 'nullpynter'
+CONFIG_FILE = 'config.json'
+
+DEFAULTS = {
+    # Entries to keep in the history before the least recently used ones are
+    # dropped. 0 keeps everything.
+    'history_max_entries': 100000,
+    # If set, request statistics are also written here in the Prometheus
+    # text format, for node_exporter's textfile collector
+    'prometheus_textfile': '',
+    # Nullpointer services to spread requests over and fail over between,
+    # when no service is given. The first is preferred until others prove
+    # faster.
+    'endpoints': [],
+    # Requests per second to make to each service, and how many may be made
+    # at once. 0 leaves it to the service to say when to slow down.
+    'request_rate': 0.0,
+    'request_burst': 5,
+}
+
+_config:dict = {}
+
+def get_config_path() -> Path:
+    """ Get the path to the config file ($XDG_CONFIG_HOME is respected)."""
+    config_home = os.environ.get('XDG_CONFIG_HOME')
+    if config_home:
+        return Path(config_home) / APP_DIR / CONFIG_FILE
+    return Path.home() / os.path.join(*CONFIG_PATH) / APP_DIR / CONFIG_FILE
+
+def get_config() -> dict:
+    """ Get the user's settings, with defaults for anything not set.
+
+    The config file is a JSON object, e.g. {"history_max_entries": 5000}. It
+    is only read once per process. A missing or broken file just means the
+    defaults are used.
+    """
+    if not _config:
+        _config.update(DEFAULTS)
+        try:
+            with open(get_config_path(), mode='r') as config_file:
+                settings = json.load(config_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            settings = {}
+        if isinstance(settings, dict):
+            _config.update(settings)
+    return _config
+
+def get(key:str):
+    """ Get a single setting"""
+    return get_config()[key]
@@ -0,0 +1,262 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+daemon - a long-running npy process serving requests over a Unix socket
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+from . import config
+
+SOCKET_NAME = 'nullpynter.sock'
+
+# The request class for each action, as (module, class)
+ACTIONS = {
+    'upload': ('nullpynter.upload', 'Upload'),
+    'remote': ('nullpynter.remote', 'Remote'),
+    'shorten': ('nullpynter.shorten', 'Shorten'),
+}
+
+def get_action_class(action:str):
+    """ Import and return the request class for an action.
+
+    Raises:
+        KeyError if there is no such action
+    """
+    #pylint: disable=import-outside-toplevel
+    import importlib
+    module, name = ACTIONS[action]
+    return getattr(importlib.import_module(module), name)
+
+def get_socket_path() -> Path:
+    """ Get the path of the daemon's socket.
+
+    This is in $XDG_RUNTIME_DIR when it's set, otherwise the application data
+    directory.
+    """
+    # The npy command imports this module for ACTIONS, so the history (and
+    # sqlite3 with it) is only imported once it's needed.
+    #pylint: disable=import-outside-toplevel
+    from .history import get_data_dir
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return Path(runtime_dir) / SOCKET_NAME
+    return get_data_dir() / SOCKET_NAME
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """ Handles a single client of the daemon.
+
+    The client sends one line of JSON describing a batch:
+        {"action": "upload", "items": [...], "url": "http://0x0.st",
+         "jobs": 16, "ordered": false, "retries": 3, "rate": 2.0}
+    and the daemon replies with one line of JSON per item,
+        {"item": "...", "response": "...", "error": ""}
+    followed by {"done": true}.
+    """
+
+    def handle(self):
+        #pylint: disable=import-outside-toplevel
+        from .batch import DEFAULT_JOBS, run_batch
+        from .endpoints import default_service_url, get_endpoints
+        from .ratelimit import RequestLimiter
+        from .retry import RetryPolicy
+
+        line = self.rfile.readline()
+        if not line:
+            # Just checking whether the daemon is running
+            return
+        try:
+            request = json.loads(line)
+            action_class = get_action_class(request['action'])
+            items = list(request['items'])
+        except (ValueError, KeyError, TypeError) as err:
+            self._send({'error': f'Bad request: {err}', 'done': True})
+            return
+
+        retry_policy = None
+        if 'retries' in request:
+            retry_policy = RetryPolicy(attempts=int(request['retries']) + 1)
+        limiter = None
+        if request.get('rate'):
+            limiter = RequestLimiter(
+                float(request['rate']),
+                config.get('request_burst')
+            )
+
+        results = run_batch(
+            action_class,
+            items,
+            service_url=request.get('url') or default_service_url(),
+            jobs=int(request.get('jobs', DEFAULT_JOBS)),
+            ordered=bool(request.get('ordered')),
+            transport=self.server.transport,
+            retry_policy=retry_policy,
+            endpoints=get_endpoints(request.get('url') or ''),
+            limiter=limiter
+        )
+        try:
+            for item, response, error in results:
+                self._send({
+                    'item': item,
+                    'response': response,
+                    'error': str(error) if error else '',
+                })
+            self._send({'done': True})
+        except BrokenPipeError:
+            # The client went away; the rest of the batch is abandoned
+            pass
+
+    def _send(self, message:dict):
+        self.wfile.write(json.dumps(message).encode('UTF-8') + b'\n')
+        self.wfile.flush()
+
+class NpyDaemon(socketserver.ThreadingUnixStreamServer):
+    """ Serves npy requests over a Unix socket.
+
+    Everything that is expensive to set up for each run of npy is kept warm
+    between requests: the interpreter and imports, the connection pool (and
+    with it DNS, TCP and TLS to the service), the history and the file hash
+    cache.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path:Path = None, transport=None) -> None:
+        #pylint: disable=import-outside-toplevel
+        from .digest import get_hash_cache
+        from .history import get_history
+        from .transport import Transport
+
+        self.socket_path = Path(socket_path or get_socket_path())
+        self.transport = transport or Transport(maxsize=16)
+        remove_stale_socket(self.socket_path)
+
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(str(self.socket_path), DaemonHandler)
+        finally:
+            os.umask(old_umask)
+
+        # Warm these up now rather than on the first request
+        get_history()
+        get_hash_cache()
+
+    def server_close(self):
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+def remove_stale_socket(socket_path:Path):
+    """ Remove a socket left behind by a daemon which is no longer running.
+
+    Raises:
+        RuntimeError if a daemon is still listening on the socket
+    """
+    if not socket_path.exists():
+        return
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        socket_path.unlink(missing_ok=True)
+        return
+    raise RuntimeError(f'A daemon is already running on {socket_path}')
+
+def run_daemon(socket_path:Path = None):
+    """ Run the daemon in the foreground until interrupted."""
+    daemon = NpyDaemon(socket_path)
+    # Clean up the socket when stopped by a service manager, too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f'nullpynter: Daemon listening on {daemon.socket_path}', file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+
+def forward(request:dict, socket_path:Path = None):
+    """ Send a batch to a running daemon, if there is one.
+
+    Arguments:
+        request - The batch, as described in DaemonHandler. Paths of files
+            to upload must be absolute, as the daemon has its own working
+            directory.
+
+    Returns:
+        An iterator of (item, response, error) like run_batch(), or None if
+        no daemon is running. The iterator raises ConnectionError if the
+        daemon goes away before it has answered for every item, and
+        RuntimeError if the daemon couldn't handle the request.
+    """
+    socket_path = Path(socket_path or get_socket_path())
+    if not socket_path.exists():
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        client.close()
+        return None
+    try:
+        client.sendall(json.dumps(request).encode('UTF-8') + b'\n')
+    except ConnectionError:
+        client.close()
+        return None
+    return _read_results(client)
+
+def _read_results(client:socket.socket):
+    """ Yield the results sent back by the daemon."""
+    with client, client.makefile('rb') as replies:
+        for line in replies:
+            try:
+                message = json.loads(line)
+                if message.get('done'):
+                    if message.get('error'):
+                        raise RuntimeError(message['error'])
+                    return
+                result = (
+                    message['item'], message['response'], message['error']
+                )
+            except (ValueError, KeyError, AttributeError) as err:
+                # A reply cut short, most likely by the daemon going away
+                raise ConnectionError(f'Bad reply from the daemon: {err}')
+            yield result
+        raise ConnectionError('The daemon closed the connection early')
@@ -0,0 +1,109 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+digest - content digests for uploaded files
+"""
+
+import hashlib
+import os
+import threading
+
+from .history import get_history
+from .multipart import CHUNK_SIZE
+from .profiling import span
+
+ALGORITHM = 'sha256'
+
+def file_digest(path:str, chunk_size:int = CHUNK_SIZE) -> str:
+    """ Compute the content digest of a file.
+
+    Arguments:
+        path - The path of the file to hash
+        chunk_size - The number of bytes to read from the file at a time
+
+    Returns:
+        The digest as a string in the form 'sha256:<hexdigest>'
+    """
+    digest = hashlib.new(ALGORITHM)
+    with open(path, mode='rb') as hash_file:
+        for chunk in iter(lambda: hash_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return f'{ALGORITHM}:{digest.hexdigest()}'
+
+_hash_cache = None
+_hash_cache_lock = threading.Lock()
+
+def get_hash_cache() -> 'HashCache':
+    """ Get the HashCache shared by everything in this process."""
+    global _hash_cache
+    with _hash_cache_lock:
+        if not _hash_cache:
+            _hash_cache = HashCache()
+        return _hash_cache
+
+class HashCache:
+    """ A cache of file content digests.
+
+    Hashing a large file means reading all of it, so digests are remembered
+    by the identity and state of the file on disk: (device, inode, size,
+    mtime_ns). As long as none of those change, the file is assumed to be
+    unchanged and is never re-hashed. The digests are kept in the history
+    database, so remembering one costs a single small write however many
+    are remembered already, and they're shared with other processes.
+    """
+
+    def __init__(self, history=None) -> None:
+        """ Class constructor
+
+        Arguments:
+            history - The NpyHistory to keep the digests in (default is the
+                shared one)
+        """
+        self.history = history or get_history()
+
+    def digest(self, path:str) -> str:
+        """ Get the content digest for a file, hashing it only if required.
+
+        Arguments:
+            path - The path of the file
+
+        Returns:
+            The digest as a string in the form 'sha256:<hexdigest>'
+        """
+        stat = os.stat(path)
+        key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        digest = self.history.get_digest(*key)
+        if not digest:
+            with span('file.hash'):
+                digest = file_digest(path)
+            self.history.set_digest(*key, digest)
+        return digest
@@ -0,0 +1,182 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+endpoints - choosing between several Nullpointer services
+"""
+
+import threading
+import time
+
+from . import config
+
+# Weight of each new latency sample in the moving average
+LATENCY_SMOOTHING = 0.3
+
+# Seconds an endpoint is left alone after failing, doubling with each
+# further failure in a row, up to MAX_COOLDOWN
+COOLDOWN = 10.0
+MAX_COOLDOWN = 300.0
+
+class Endpoint:
+    """ The health of one service.
+
+    Attributes:
+        url(str): The URL of the service
+        latency(float): Moving average of seconds per successful request (0
+            until one has been made)
+        failures(int): Failures since the last success
+        down_until(float): time.monotonic() until which the service is
+            treated as down
+        in_flight(int): Requests currently being sent to the service
+    """
+
+    def __init__(self, url:str) -> None:
+        self.url = url
+        self.latency:float = 0
+        self.failures:int = 0
+        self.down_until:float = 0
+        self.in_flight:int = 0
+
+    @property
+    def healthy(self) -> bool:
+        """bool: Whether the service isn't cooling off after failures."""
+        return time.monotonic() >= self.down_until
+
+    @property
+    def score(self) -> float:
+        """float: Roughly how long a new request would take; lower is better.
+
+        Requests already in flight count against the service, so a batch is
+        spread over the services in proportion to how fast they are.
+        """
+        return self.latency * (self.in_flight + 1)
+
+class EndpointPool:
+    """ Several services which can stand in for each other.
+
+    Requests go to the healthy service with the lowest score. A service that
+    fails is skipped for a cooldown period which grows with each failure in
+    a row; if every service is down, the one due back soonest is tried
+    anyway. A pool may be shared between threads.
+    """
+
+    def __init__(self, urls:list) -> None:
+        if not urls:
+            raise ValueError('An EndpointPool needs at least one URL')
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> list:
+        """list: The URLs of the services, in the order they were given."""
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def ranked(self) -> list:
+        """ Get the URLs of the services, best first."""
+        with self._lock:
+            healthy = sorted(
+                (endpoint for endpoint in self.endpoints if endpoint.healthy),
+                key=lambda endpoint: endpoint.score
+            )
+            down = sorted(
+                (
+                    endpoint for endpoint in self.endpoints
+                    if not endpoint.healthy
+                ),
+                key=lambda endpoint: endpoint.down_until
+            )
+        return [endpoint.url for endpoint in healthy + down]
+
+    def started(self, url:str):
+        """ Note that a request to a service has started"""
+        with self._lock:
+            self._by_url[url].in_flight += 1
+
+    def finished(self, url:str, seconds:float = 0, failed:bool = False):
+        """ Note that a request to a service has finished.
+
+        Arguments:
+            url - The service the request went to
+            seconds - How long the service took to respond, if it did
+            failed - Whether the service failed to handle the request. If
+                neither this nor seconds is given, the request was abandoned
+                and says nothing about the service.
+        """
+        with self._lock:
+            endpoint = self._by_url[url]
+            endpoint.in_flight -= 1
+            if failed:
+                endpoint.failures += 1
+                endpoint.down_until = time.monotonic() + min(
+                    MAX_COOLDOWN, COOLDOWN * 2 ** (endpoint.failures - 1)
+                )
+            elif seconds:
+                endpoint.failures = 0
+                endpoint.down_until = 0
+                if endpoint.latency:
+                    endpoint.latency += LATENCY_SMOOTHING * (
+                        seconds - endpoint.latency
+                    )
+                else:
+                    endpoint.latency = seconds
+
+_pools:dict = {}
+_pools_lock = threading.Lock()
+
+def get_endpoints(service_url:str = ''):
+    """ Get the services to use.
+
+    Arguments:
+        service_url - A service the user asked for. This overrides the
+            endpoints setting.
+
+    Returns:
+        The EndpointPool shared by everything in this process for the
+        endpoints setting, or None if a single service should be used.
+    """
+    urls = config.get('endpoints')
+    if service_url or len(urls) < 2:
+        return None
+    with _pools_lock:
+        key = tuple(urls)
+        try:
+            return _pools[key]
+        except KeyError:
+            pool = EndpointPool(list(urls))
+            _pools[key] = pool
+            return pool
+
+def default_service_url() -> str:
+    """ Get the service to use when none is given."""
+    urls = config.get('endpoints')
+    return urls[0] if urls else 'http://0x0.st'
@@ -32,13 +32,12 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 gui - The application gui
 """
-import urllib3
 import gi
 
+from ..batch import DEFAULT_JOBS
+from ..transport import Transport
 from .window import NpyWindow
 
-http = urllib3.PoolManager()
-
 gi.require_versions(
     {
         'Gtk': '4.0',
@@ -51,7 +50,9 @@ from gi.repository import GLib, Gtk
 GLib.threads_init()
 
 def on_activate(app):
-    window = NpyWindow(application=app, pool=http)
+    # Enough connections for each of the queue's workers to keep one open
+    transport = Transport(maxsize=DEFAULT_JOBS)
+    window = NpyWindow(application=app, transport=transport)
     window.present()
     
 app = Gtk.Application(application_id='ro.santopiet.nullpynter')
@@ -42,3 +42,13 @@ class Action(Enum):
         if self.value == 'Remote':
             return 'Upload'
         return self.value
+
+class Status(Enum):
+    QUEUED = 'Queued'
+    SENDING = 'Sending'
+    DONE = 'Done'
+    FAILED = 'Failed'
+    CANCELLED = 'Cancelled'
+
+    def finished(self):
+        return self not in (Status.QUEUED, Status.SENDING)
@@ -30,19 +30,15 @@ CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-import urllib3
+from gi.repository import Gtk, Pango
 
-from threading import Thread
-from gi.repository import GLib, Gtk, Pango
-
-
-http = urllib3.PoolManager()
+from .threads import InfoThread
 
 class Headerbar(Gtk.HeaderBar):
     """Application headerbar"""
 
-    def __init__(self, url:str = "http://0x0.st", pool=None) -> None:
-        self.http = pool
+    def __init__(self, url:str = "http://0x0.st", transport=None) -> None:
+        self.transport = transport
 
         super().__init__()
         self.url = url
@@ -75,7 +71,8 @@ class Headerbar(Gtk.HeaderBar):
 
     def update_info(self):
         """Update the text in the info_label"""
-        info_thread = InfoThread(self.url, self.info_label)
+        info_thread = InfoThread(self.url, self.info_label, self.transport)
+        info_thread.start()
     
     def show_hide_popover(self, widget, data=None):
         print('showing/hiding popover')
@@ -83,18 +80,3 @@ class Headerbar(Gtk.HeaderBar):
             self.info_popover.popup()
         else:
             self.info_popover.popdown()
-
-class InfoThread(Thread):
-
-    def __init__(self, url, widget):
-        super().__init__()
-        self.url = url
-        self.wigdet = widget
-
-    def run(self):
-        icon_request = http.request(
-            'GET',
-            self.url
-        )
-        icon_text = icon_request.data.decode('UTF-8').strip()
-        GLib.idle_add(self.wigdet.set_markup, icon_text)
@@ -0,0 +1,258 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import collections
+import time
+from threading import Thread
+
+from gi.repository import Gio, GLib, GObject, Gtk, Pango
+
+from .clipboard import copy_text
+from ..history import get_history
+
+# Entries are loaded from the history this many at a time, and only the most
+# recently used pages are kept.
+PAGE_SIZE = 100
+MAX_PAGES = 20
+
+# Milliseconds to wait after typing before searching
+SEARCH_DELAY = 150
+
+class HistoryEntry(GObject.Object):
+    """An entry in the history"""
+
+    def __init__(
+            self,
+            entry_id:int,
+            url:str = '',
+            item:str = '',
+            response:str = '',
+            name:str = '',
+            created:float = 0
+        ) -> None:
+        super().__init__()
+        self.entry_id = entry_id
+        self.url = url
+        self.item = item
+        self.response = response
+        self.name = name or item
+        self.created = created
+
+class HistoryModel(GObject.Object, Gio.ListModel):
+    """ A Gio.ListModel over the history, for a Gtk.ListView.
+
+    The model only holds the IDs of the entries matching the current search.
+    The entries themselves are loaded a page at a time as the view asks for
+    them, so only what's on screen (and nearby) is kept in memory. Searches
+    run in a thread, so typing doesn't block the main loop however big the
+    history is.
+    """
+
+    def __init__(self, history=None) -> None:
+        super().__init__()
+        self.history = history or get_history()
+        self.search_text:str = ''
+        self._ids:list = []
+        self._pages = collections.OrderedDict()
+        self._generation:int = 0
+
+    def do_get_item_type(self):
+        return HistoryEntry.__gtype__
+
+    def do_get_n_items(self) -> int:
+        return len(self._ids)
+
+    def do_get_item(self, position:int):
+        if position >= len(self._ids):
+            return None
+        page_number = position // PAGE_SIZE
+        try:
+            page = self._pages[page_number]
+            self._pages.move_to_end(page_number)
+        except KeyError:
+            page = self._load_page(page_number)
+        return page[position % PAGE_SIZE]
+
+    def refresh(self, search_text:str = None):
+        """ Search the history again, in the background.
+
+        Arguments:
+            search_text - What to search for (default is the current search)
+        """
+        if search_text is not None:
+            self.search_text = search_text
+        self._generation += 1
+        Thread(
+            target=self._search,
+            args=(self._generation, self.search_text),
+            daemon=True
+        ).start()
+
+    def remove(self, entry:HistoryEntry):
+        """ Remove an entry from the history (but not from the service)"""
+        self.history.forget([entry.response])
+        try:
+            position = self._ids.index(entry.entry_id)
+        except ValueError:
+            return
+        del self._ids[position]
+        self._pages.clear()
+        self.items_changed(position, 1, 0)
+
+    def _load_page(self, page_number:int) -> list:
+        """ Load a page of entries from the history"""
+        start = page_number * PAGE_SIZE
+        ids = self._ids[start:start + PAGE_SIZE]
+        rows = self.history.get_entries(ids)
+        page = [
+            HistoryEntry(entry_id, *rows.get(entry_id, ()))
+            for entry_id in ids
+        ]
+        self._pages[page_number] = page
+        if len(self._pages) > MAX_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    def _search(self, generation:int, search_text:str):
+        """ Find the matching entries (in a thread)"""
+        ids = self.history.search(search_text)
+        GLib.idle_add(self._set_ids, generation, ids)
+
+    def _set_ids(self, generation:int, ids:list) -> bool:
+        # A newer search was started while this one ran
+        if generation != self._generation:
+            return False
+        removed = len(self._ids)
+        self._ids = ids
+        self._pages.clear()
+        self.items_changed(0, removed, len(ids))
+        return False
+
+class HistoryPane(Gtk.Box):
+    """A searchable list of everything in the history"""
+
+    def __init__(self, history=None) -> None:
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.props.margin_start = 12
+        self.props.margin_end = 12
+        self.props.margin_top = 12
+        self.props.margin_bottom = 12
+        self.model = HistoryModel(history)
+        self._search_timeout:int = 0
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text('Search history')
+        self.search_entry.connect('search-changed', self.search_changed)
+        self.append(self.search_entry)
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self.setup_row)
+        factory.connect('bind', self.bind_row)
+
+        list_view = Gtk.ListView.new(Gtk.NoSelection.new(self.model), factory)
+        scroller = Gtk.ScrolledWindow()
+        scroller.set_vexpand(True)
+        scroller.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroller.set_child(list_view)
+        self.append(scroller)
+
+    def refresh(self):
+        """ Show any changes to the history"""
+        self.model.refresh()
+
+    def search_changed(self, widget, data=None):
+        """ Search the history once the user stops typing for a moment"""
+        if self._search_timeout:
+            GLib.source_remove(self._search_timeout)
+        self._search_timeout = GLib.timeout_add(
+            SEARCH_DELAY, self.start_search
+        )
+
+    def start_search(self) -> bool:
+        self._search_timeout = 0
+        self.model.refresh(self.search_entry.get_text())
+        return False
+
+    def setup_row(self, factory, list_item):
+        """ Build the widgets for a row, which are reused as it scrolls"""
+        row = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 6)
+        row.props.margin_top = 3
+        row.props.margin_bottom = 3
+
+        labels = Gtk.Box.new(Gtk.Orientation.VERTICAL, 0)
+        labels.set_hexpand(True)
+        row.append(labels)
+
+        row.name_label = Gtk.Label()
+        row.name_label.set_xalign(0)
+        row.name_label.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+        labels.append(row.name_label)
+
+        row.response_label = Gtk.Label()
+        row.response_label.set_xalign(0)
+        row.response_label.set_ellipsize(Pango.EllipsizeMode.END)
+        row.response_label.add_css_class('dim-label')
+        labels.append(row.response_label)
+
+        copy_button = Gtk.Button.new_from_icon_name('edit-copy-symbolic')
+        copy_button.set_tooltip_text('Copy')
+        copy_button.set_valign(Gtk.Align.CENTER)
+        copy_button.connect('clicked', self.copy_clicked, list_item)
+        row.append(copy_button)
+
+        remove_button = Gtk.Button.new_from_icon_name('user-trash-symbolic')
+        remove_button.set_tooltip_text('Remove from history')
+        remove_button.set_valign(Gtk.Align.CENTER)
+        remove_button.connect('clicked', self.remove_clicked, list_item)
+        row.append(remove_button)
+
+        list_item.set_child(row)
+
+    def bind_row(self, factory, list_item):
+        """ Show an entry in a row"""
+        entry = list_item.get_item()
+        row = list_item.get_child()
+        row.name_label.set_text(entry.name)
+        sent = ''
+        if entry.created:
+            sent = time.strftime(
+                ' (%Y-%m-%d %H:%M)', time.localtime(entry.created)
+            )
+        row.response_label.set_text(entry.response + sent)
+        row.set_tooltip_text(f'{entry.name}\n{entry.url}')
+
+    def copy_clicked(self, widget, list_item):
+        copy_text(self, list_item.get_item().response)
+
+    def remove_clicked(self, widget, list_item):
+        self.model.remove(list_item.get_item())
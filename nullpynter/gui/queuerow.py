@@ -0,0 +1,115 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from gi.repository import Gtk, Pango
+
+from .clipboard import copy_text
+from .enums import Action, Status
+
+class QueueRow(Gtk.Box):
+    """A row in the upload queue, showing the status of one item"""
+
+    def __init__(self, queue_item, cancel=None) -> None:
+        super().__init__(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.queue_item = queue_item
+        self.cancel = cancel
+        self.props.margin_top = 3
+        self.props.margin_bottom = 3
+
+        info_box = Gtk.Box.new(Gtk.Orientation.VERTICAL, 3)
+        info_box.set_hexpand(True)
+        self.append(info_box)
+
+        self.item_label = Gtk.Label.new(queue_item.item)
+        self.item_label.set_xalign(0)
+        self.item_label.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+        info_box.append(self.item_label)
+
+        self.progress_bar = Gtk.ProgressBar()
+        self.progress_bar.set_show_text(True)
+        info_box.append(self.progress_bar)
+
+        self.response_entry = Gtk.Entry()
+        self.response_entry.set_editable(False)
+        self.response_entry.set_visible(False)
+        info_box.append(self.response_entry)
+
+        self.copy_button = Gtk.Button.new_from_icon_name('edit-copy-symbolic')
+        self.copy_button.set_tooltip_text('Copy')
+        self.copy_button.set_valign(Gtk.Align.CENTER)
+        self.copy_button.set_visible(False)
+        self.copy_button.connect('clicked', self.copy_clicked)
+        self.append(self.copy_button)
+
+        self.cancel_button = Gtk.Button.new_from_icon_name(
+            'process-stop-symbolic'
+        )
+        self.cancel_button.set_tooltip_text('Cancel')
+        self.cancel_button.set_valign(Gtk.Align.CENTER)
+        self.cancel_button.connect('clicked', self.cancel_clicked)
+        self.append(self.cancel_button)
+
+        self.update()
+
+    def update(self):
+        """ Show the current state of the item"""
+        queue_item = self.queue_item
+        status = queue_item.status
+        finished = status.finished()
+
+        self.progress_bar.set_visible(not finished)
+        if status is Status.SENDING and queue_item.action is Action.UPLOAD:
+            self.progress_bar.set_fraction(queue_item.fraction)
+            self.progress_bar.set_text(queue_item.progress_text)
+        elif status is Status.SENDING:
+            self.progress_bar.pulse()
+            self.progress_bar.set_text(status.value)
+        else:
+            self.progress_bar.set_text(status.value)
+
+        self.response_entry.set_visible(finished)
+        if status is Status.CANCELLED:
+            self.response_entry.set_text(status.value)
+        else:
+            self.response_entry.set_text(queue_item.response)
+        self.copy_button.set_visible(status is Status.DONE)
+        self.cancel_button.set_visible(not finished)
+        self.cancel_button.set_sensitive(not queue_item.cancelled)
+
+    def cancel_clicked(self, widget, data=None):
+        if self.cancel:
+            self.cancel(self.queue_item)
+        self.update()
+
+    def copy_clicked(self, widget, data=None):
+        copy_text(self, self.queue_item.response)
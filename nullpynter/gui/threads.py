@@ -31,66 +31,207 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 import time
+from concurrent.futures import ThreadPoolExecutor
 from threading import Thread
 from gi.repository import GLib
 
-from .enums import Action
+from .enums import Action, Status
+from ..batch import DEFAULT_JOBS
+from ..info import get_info_cache
 from ..remote import Remote
 from ..shorten import Shorten
+from ..transport import Transport, TransportError, get_transport
 from ..upload import Upload
 
 class InfoThread(Thread):
 
-    def __init__(self, url, widget, pool):
+    def __init__(self, url, widget, transport=None):
         super().__init__()
         self.url = url
         self.wigdet = widget
-        self.http = pool
+        self.transport = transport or get_transport()
 
     def run(self):
-        icon_request = self.http.request(
-            'GET',
-            self.url
+        # The page is cached on disk and only re-fetched, with the transport
+        # this thread was given, once it's stale
+        info_cache = get_info_cache()
+        try:
+            icon_text = info_cache.get(self.url, transport=self.transport).text
+        except TransportError as err:
+            icon_text = f'Could not fetch info from service: {err}'
+        GLib.idle_add(self.wigdet.set_text, icon_text)
+
+class Cancelled(Exception):
+    """ The user cancelled an item while it was being sent."""
+
+class QueueItem:
+    """ An item waiting to be sent, or being sent, by an UploadQueue.
+
+    The worker sending the item updates these attributes, and the callback
+    is then run in the main loop to show them.
+
+    Attributes:
+        item(str): The filename or URL to send
+        action(Action): What to do with the item
+        service_url(str): The URL of the Nullpointer service
+        callback: Called in the main loop with this item when it changes
+        status(Status): Where the item is up to
+        response(str): The response from the service, or the error
+        fraction(float): How much of an upload has been sent
+        progress_text(str): A description of an upload's progress
+        cancelled(bool): Whether the user has cancelled the item
+    """
+
+    def __init__(
+            self,
+            item:str,
+            action:Action,
+            service_url:str,
+            callback=None
+        ) -> None:
+        self.item = item
+        self.action = action
+        self.service_url = service_url
+        self.callback = callback
+        self.status = Status.QUEUED
+        self.response:str = ''
+        self.fraction:float = 0
+        self.progress_text:str = ''
+        self.cancelled:bool = False
+        self.future = None
+
+    def update(self, **changes):
+        """ Change some attributes, then run the callback in the main loop."""
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if self.callback:
+            GLib.idle_add(self._run_callback)
+
+    def show_progress(self, progress):
+        """ Record upload progress, stopping the upload if it's cancelled.
+
+        Progress throttles how often this is called, so the main loop isn't
+        flooded with updates while the transfer is running.
+        """
+        if self.cancelled:
+            raise Cancelled()
+        self.update(
+            fraction=progress.fraction,
+            progress_text=progress.describe()
         )
-        icon_text = icon_request.data.decode('UTF-8').strip()
-        GLib.idle_add(self.wigdet.set_markup, icon_text)
 
-class ServiceThread(Thread):
-    
-    def __init__(self, widget):
-        super().__init__()
-        self.wigdet = widget
-        self.http = widget.http
-    
-    def run(self):
-        action_map = {
-            Action.UPLOAD: self.upload,
-            Action.REMOTE: self.remote,
-            Action.SHORTEN: self.shorten
-        }
-        item_text = self.wigdet.item_entry.get_text()
-        service_url = self.wigdet.url_entry.get_text()
-        service_action = self.wigdet.action.value
-        print(f'Sending {item_text} to {service_url} for {self.wigdet.action}')
-        
-        response = action_map[self.wigdet.action](item_text, service_url)
-
-        GLib.idle_add(self.wigdet.response_entry.set_text, response)
-        GLib.idle_add(self.wigdet.set_sensitive, True)
-        GLib.idle_add(self.wigdet.busy_spinner.stop)
-    
-    def shorten(self, item, url):
-        short = Shorten(service_url=url)
-        short.set_request_params(item)
-        return short.send_request()
-        
-    def remote(self, item, url):
-        rem = Remote(service_url=url)
-        rem.set_request_params(item)
-        return rem.send_request()
-        
-    def upload(self, item, url):
-        upl = Upload(service_url=url)
-        upl.set_request_params(item)
-        return upl.send_request()
-        
\ No newline at end of file
+    def _run_callback(self) -> bool:
+        self.callback(self)
+        return False
+
+class UploadQueue:
+    """ Sends items to the service using a pool of worker threads.
+
+    Items can be added at any time; they wait in the queue until one of the
+    workers is free. Everything shares one transport, so connections to the
+    service are reused between items. It should keep at least jobs
+    connections per host (as the default one does), or the connections of
+    the extra workers are thrown away after each item.
+
+    Attributes:
+        transport(Transport): The transport to send requests with
+        jobs(int): The most items to send at once
+    """
+    actions = {
+        Action.UPLOAD: Upload,
+        Action.REMOTE: Remote,
+        Action.SHORTEN: Shorten,
+    }
+
+    def __init__(self, transport=None, jobs:int = DEFAULT_JOBS) -> None:
+        self.transport = transport or Transport(maxsize=jobs)
+        self.jobs = jobs
+        self.items:list = []
+        self._executor = ThreadPoolExecutor(
+            max_workers=jobs,
+            thread_name_prefix='npy-queue'
+        )
+
+    @property
+    def active(self) -> int:
+        """int: The number of items which are queued or being sent."""
+        return len([item for item in self.items if not item.status.finished()])
+
+    def add(self, item:str, action:Action, service_url:str, callback=None):
+        """ Add an item to the queue.
+
+        Arguments:
+            item - The filename or URL to send
+            action - What to do with the item
+            service_url - The URL of the Nullpointer service
+            callback - Called in the main loop with the QueueItem whenever
+                it changes
+
+        Returns:
+            The QueueItem for the item
+        """
+        queue_item = QueueItem(item, action, service_url, callback)
+        self.items.append(queue_item)
+        queue_item.future = self._executor.submit(self._send, queue_item)
+        return queue_item
+
+    def cancel(self, queue_item:QueueItem):
+        """ Cancel an item.
+
+        An item still in the queue is dropped straight away. An upload which
+        has started is stopped the next time it reports its progress; other
+        requests in flight are small, so they finish but their result is
+        thrown away.
+        """
+        queue_item.cancelled = True
+        if queue_item.future.cancel():
+            queue_item.update(status=Status.CANCELLED)
+
+    def remove_finished(self) -> list:
+        """ Forget about the items which have finished.
+
+        Returns:
+            The QueueItems removed
+        """
+        finished = [item for item in self.items if item.status.finished()]
+        self.items = [
+            item for item in self.items if not item.status.finished()
+        ]
+        return finished
+
+    def shutdown(self):
+        """ Cancel everything and stop the workers, without waiting."""
+        for queue_item in self.items:
+            queue_item.cancelled = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _send(self, queue_item:QueueItem):
+        """ Send an item to the service (in a worker thread)"""
+        if queue_item.cancelled:
+            queue_item.update(status=Status.CANCELLED)
+            return
+        queue_item.update(status=Status.SENDING)
+
+        request = self.actions[queue_item.action](
+            service_url=queue_item.service_url,
+            transport=self.transport
+        )
+        if queue_item.action is Action.UPLOAD:
+            request.progress_callback = queue_item.show_progress
+        try:
+            request.set_request_params(queue_item.item)
+            response = request.send_request()
+        except Cancelled:
+            queue_item.update(status=Status.CANCELLED)
+            return
+        except Exception as err: #pylint: disable=broad-except
+            queue_item.update(status=Status.FAILED, response=str(err))
+            return
+
+        if queue_item.cancelled:
+            status = Status.CANCELLED
+        elif response.startswith('http'):
+            status = Status.DONE
+        else:
+            status = Status.FAILED
+        queue_item.update(status=status, response=response, fraction=1.0)
@@ -43,9 +43,14 @@ gi.require_versions(
 
 from gi.repository import Gdk, Gtk
 
-from .enums import Action
+from ..endpoints import default_service_url
+
+from .clipboard import copy_text
+from .enums import Action, Status
 from .headerbar import Headerbar
-from .threads import ServiceThread
+from .history import HistoryPane
+from .queuerow import QueueRow
+from .threads import UploadQueue
 
 IMAGE_FILETYPES = [
     'jpg',
@@ -66,13 +71,15 @@ IMAGE_FILETYPES = [
 class NpyWindow(Gtk.ApplicationWindow):
     """Main Window"""
 
-    def __init__(self, application=None, pool=None) -> None:
+    def __init__(self, application=None, transport=None) -> None:
         super().__init__(application=application)
-        self.http = pool
+        self.transport = transport
         self.set_title('Nullpynter')
         self.action = None
+        self.queue = UploadQueue(transport=transport)
+        self.connect('close-request', self.close_requested)
 
-        self.headerbar = Headerbar()
+        self.headerbar = Headerbar(transport=transport)
         self.set_titlebar(self.headerbar)
 
         self.content_grid = Gtk.Grid()
@@ -83,7 +90,18 @@ class NpyWindow(Gtk.ApplicationWindow):
         self.content_grid.props.row_spacing = 6
         self.content_grid.props.column_spacing = 6
         self.content_grid.set_hexpand(True)
-        self.set_child(self.content_grid)
+
+        self.history_pane = HistoryPane()
+
+        self.stack = Gtk.Stack()
+        self.stack.add_titled(self.content_grid, 'send', 'Send')
+        self.stack.add_titled(self.history_pane, 'history', 'History')
+        self.stack.connect('notify::visible-child', self.page_changed)
+        self.set_child(self.stack)
+
+        stack_switcher = Gtk.StackSwitcher()
+        stack_switcher.set_stack(self.stack)
+        self.headerbar.set_title_widget(stack_switcher)
 
         entry_label = Gtk.Label.new('Item to upload')
         self.content_grid.attach(entry_label, 0, 1, 1, 1)
@@ -131,11 +149,42 @@ class NpyWindow(Gtk.ApplicationWindow):
 
         self.url_entry = Gtk.Entry()
         self.url_entry.set_hexpand(True)
-        self.url_entry.set_text('http://0x0.st')
+        self.url_entry.set_text(default_service_url())
         self.url_entry.set_placeholder_text('Nullpointer service URL')
         self.url_entry.set_width_chars(20)
         self.content_grid.attach(self.url_entry, 1, 4, 1, 1)
 
+        queue_scroller = Gtk.ScrolledWindow()
+        queue_scroller.set_vexpand(True)
+        queue_scroller.set_min_content_height(150)
+        queue_scroller.set_policy(
+            Gtk.PolicyType.NEVER,
+            Gtk.PolicyType.AUTOMATIC
+        )
+        self.content_grid.attach(queue_scroller, 0, 5, 2, 1)
+
+        self.queue_list = Gtk.ListBox()
+        self.queue_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        queue_scroller.set_child(self.queue_list)
+        self.queue_rows:dict = {}
+
+        queue_buttons = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 6)
+        queue_buttons.set_halign(Gtk.Align.END)
+        self.content_grid.attach(queue_buttons, 0, 6, 2, 1)
+
+        self.clear_button = Gtk.Button.new_with_label('Clear Finished')
+        self.clear_button.connect('clicked', self.clear_finished_clicked)
+        queue_buttons.append(self.clear_button)
+
+        self.copy_all_button = Gtk.Button.new_with_label('Copy All Links')
+        self.copy_all_button.connect('clicked', self.copy_all_clicked)
+        queue_buttons.append(self.copy_all_button)
+
+        # Files dropped anywhere on the window are uploaded
+        drop_target = Gtk.DropTarget.new(Gdk.FileList, Gdk.DragAction.COPY)
+        drop_target.connect('drop', self.files_dropped)
+        self.add_controller(drop_target)
+
         self.headerbar.action_button.connect('clicked', self.action_button_clicked)
 
     def set_action_button_text(self, widget, data=None):
@@ -171,18 +220,88 @@ class NpyWindow(Gtk.ApplicationWindow):
         clipboard = self.response_entry.get_clipboard()
         clipboard.set_text(self.response_entry.get_text())     
 
-    def action_button_clicked(self, widget, data=None):
-        self.set_sensitive(False)
+    def add_item(self, item:str, action:Action):
+        """ Add an item to the upload queue, with a row to show its status.
+
+        The window stays usable while items are sent, so more can be added
+        at any time.
+        """
+        queue_item = self.queue.add(
+            item,
+            action,
+            self.url_entry.get_text(),
+            callback=self.item_updated
+        )
+        row = QueueRow(queue_item, cancel=self.queue.cancel)
+        self.queue_rows[queue_item] = row
+        self.queue_list.append(row)
         self.busy_spinner.start()
-        service = ServiceThread(self)
-        service.start()
+
+    def item_updated(self, queue_item):
+        """ Show a change to an item in the queue.
+
+        This is called from the main loop (via GLib.idle_add) by the worker
+        sending the item. The item may have been cleared from the queue
+        since, in which case it has no row to update.
+        """
+        row = self.queue_rows.get(queue_item)
+        if row is not None:
+            row.update()
+            if queue_item.status is Status.DONE:
+                self.response_entry.set_text(queue_item.response)
+                if self.stack.get_visible_child_name() == 'history':
+                    self.history_pane.refresh()
+        if not self.queue.active:
+            self.busy_spinner.stop()
+
+    def add_files(self, files):
+        """ Queue a number of Gio.Files for upload"""
+        for file in files:
+            path = file.get_path()
+            if path:
+                self.add_item(path, Action.UPLOAD)
+
+    def files_dropped(self, target, value, x, y):
+        self.add_files(value.get_files())
+        return True
+
+    def copy_all_clicked(self, widget, data=None):
+        """ Copy the links for every item sent, one per line"""
+        responses = [
+            queue_item.response for queue_item in self.queue.items
+            if queue_item.status is Status.DONE
+        ]
+        if responses:
+            copy_text(self, '\n'.join(responses))
+
+    def clear_finished_clicked(self, widget, data=None):
+        for queue_item in self.queue.remove_finished():
+            self.queue_list.remove(self.queue_rows.pop(queue_item))
+
+    def page_changed(self, widget, data=None):
+        showing_history = self.stack.get_visible_child_name() == 'history'
+        self.headerbar.action_button.set_visible(not showing_history)
+        if showing_history:
+            self.history_pane.refresh()
+
+    def action_button_clicked(self, widget, data=None):
+        item_text = self.item_entry.get_text().strip()
+        if not item_text:
+            return
+        self.add_item(item_text, self.action)
+        self.item_entry.set_text('')
+
+    def close_requested(self, widget, data=None):
+        self.queue.shutdown()
+        return False
     
     def file_select_click(self, widget, data=None):
         dialog = Gtk.FileChooserDialog(
-            title="Select a file", 
+            title="Select files",
             parent=self, 
             action=Gtk.FileChooserAction.OPEN
         )
+        dialog.set_select_multiple(True)
         dialog.add_buttons(
             'Cancel',
             Gtk.ResponseType.CANCEL,
@@ -194,6 +313,15 @@ class NpyWindow(Gtk.ApplicationWindow):
         dialog.show()
     
     def dialog_button_clicked(self, widget, data=None):
-        filename = widget.get_file().get_path()
-        self.item_entry.set_text(filename)
+        """ Use the files chosen in the file chooser.
+
+        A single file is put in the entry as before, so it can be checked
+        before sending. Several files are queued for upload straight away.
+        """
+        if data == Gtk.ResponseType.OK:
+            files = list(widget.get_files())
+            if len(files) == 1:
+                self.item_entry.set_text(files[0].get_path())
+            else:
+                self.add_files(files)
         widget.destroy()
@@ -33,14 +33,134 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 history - class for the history
 """
 
+import collections
+import contextlib
 import json
 import os
+import sqlite3
+import threading
+import time
 from pathlib import Path
 
+from . import config
+from .profiling import span
+
 # Platform-specific data path. This should be relative to the home folder
 DATA_PATH = ['.local', 'share']
 APP_DIR = 'nullpynter'
 HISTFILE = 'history'
+HISTDB = 'history.db'
+
+# Seconds to wait for another process to finish writing to the history
+BUSY_TIMEOUT = 30.0
+
+# Entries are only marked as used again once this many seconds have passed,
+# so that repeated lookups don't each have to write to the database.
+TOUCH_INTERVAL = 3600
+
+# Expired and excess entries are pruned once every so many appends
+PRUNE_INTERVAL = 100
+
+# Upper bound on the number of lookups cached in memory by each NpyHistory
+MAX_CACHED = 10000
+
+# Upper bound on the number of remembered file digests
+MAX_DIGESTS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    service_url TEXT NOT NULL,
+    item TEXT NOT NULL,
+    response TEXT NOT NULL,
+    PRIMARY KEY (service_url, item)
+);
+CREATE INDEX IF NOT EXISTS history_by_response
+    ON history (service_url, response);
+"""
+
+# Changes to the schema, applied in order to databases created by older
+# versions. PRAGMA user_version records how many have been applied.
+MIGRATIONS = [
+    # The name the user gave for the item (e.g. the path of an upload, which
+    # is keyed by content digest), and a global reverse index on response.
+    """
+    ALTER TABLE history ADD COLUMN name TEXT NOT NULL DEFAULT '';
+    UPDATE history SET name = item;
+    CREATE INDEX IF NOT EXISTS history_response ON history (response);
+    """,
+    # When each item was sent, its size, when the service will delete it
+    # (if it said) and when it was last used, all as UNIX times. 0 means
+    # unknown/never.
+    """
+    ALTER TABLE history ADD COLUMN created REAL NOT NULL DEFAULT 0;
+    ALTER TABLE history ADD COLUMN size INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE history ADD COLUMN expires REAL NOT NULL DEFAULT 0;
+    ALTER TABLE history ADD COLUMN used REAL NOT NULL DEFAULT 0;
+    CREATE INDEX IF NOT EXISTS history_expires ON history (expires)
+        WHERE expires > 0;
+    CREATE INDEX IF NOT EXISTS history_used ON history (used);
+    """,
+    # When the response was last found to still be there (see verify)
+    "ALTER TABLE history ADD COLUMN verified REAL NOT NULL DEFAULT 0",
+    # Content digests of files, by the identity and state of the file on
+    # disk (see digest.HashCache)
+    """
+    CREATE TABLE IF NOT EXISTS digests (
+        dev INTEGER NOT NULL,
+        ino INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        digest TEXT NOT NULL,
+        used REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (dev, ino)
+    );
+    CREATE INDEX IF NOT EXISTS digests_used ON digests (used);
+    """,
+]
+
+def get_data_dir() -> Path:
+    """ Get the path to the application data directory, creating it if needed."""
+    data_dir_path = Path.home() / os.path.join(*DATA_PATH) / APP_DIR
+    if not data_dir_path.exists():
+        data_dir_path.mkdir(parents=True)
+    return data_dir_path
+
+def parse_expires(value:str) -> float:
+    """ Parse an X-Expires header into a UNIX time.
+
+    0x0.st gives the time in milliseconds since the epoch. Returns 0 if there
+    was no (valid) header.
+    """
+    try:
+        return int(value) / 1000
+    except (TypeError, ValueError):
+        return 0
+
+# NpyHistory objects shared within this process, by database path
+_shared_histories:dict = {}
+_shared_histories_lock = threading.Lock()
+
+def get_history(db_path:Path = None) -> 'NpyHistory':
+    """ Get the NpyHistory shared by everything in this process.
+
+    Opening the history means connecting to the database and checking its
+    schema, so requests share a single instance per database rather than each
+    opening their own.
+
+    Arguments:
+        db_path - The history database to use (default is the one in the
+            application data directory)
+    """
+    if not db_path:
+        db_path = get_data_dir() / HISTDB
+    db_path = Path(db_path)
+    with _shared_histories_lock:
+        try:
+            return _shared_histories[db_path]
+        except KeyError:
+            history = NpyHistory(db_path)
+            _shared_histories[db_path] = history
+            return history
 
 class NpyHistory:
     """ A Class to interact with the history of files.
@@ -49,47 +169,192 @@ class NpyHistory:
     This helps prevent the user needing to upload files multiple times. We can
     also check the history on upload and if a particular file/link was already
     sent, we can fetch the existing URL rather than the old one.
+
+    The history is kept in an SQLite database indexed on (service_url, item),
+    (service_url, response) and response, so adding and looking up entries in
+    either direction doesn't depend on the size of the history. A history file
+    from older versions is imported into the database the first time it is
+    opened.
+
+    The last MAX_CACHED lookups of items (including ones which found nothing)
+    are also cached in memory. The cache is thrown away whenever another
+    connection to the database (in this process or another one) commits a
+    change, which SQLite reports through PRAGMA data_version, or the database
+    file is replaced. This instance's own changes update the cache as they're
+    made, so they don't throw it away. An instance may be shared between
+    threads; see get_history().
+
+    Services like 0x0.st delete files after a while, so entries record when
+    the service said they'll expire. Expired entries are treated as if they
+    weren't there, and are pruned along with the least recently used entries
+    once the history holds more than max_entries.
     """
 
-    def __init__(self) -> None:
-        data_dir_path = Path.home() / os.path.join(*DATA_PATH) / APP_DIR
-        if not data_dir_path.exists():
-            data_dir_path.mkdir()
-        self._hist_file_path = data_dir_path / HISTFILE
-        self._hist_file_path.touch(exist_ok=True)
+    def __init__(self, db_path:Path = None, max_entries:int = None) -> None:
+        """ Class constructor
 
-        self._load_histfile()
+        Arguments:
+            db_path - The history database to use (default is the one in the
+                application data directory)
+            max_entries - How many entries to keep at most (default is the
+                history_max_entries setting; 0 for no limit)
+        """
+        if not db_path:
+            db_path = get_data_dir() / HISTDB
+        if max_entries is None:
+            max_entries = config.get('history_max_entries')
+        self._hist_db_path = Path(db_path)
+        self.max_entries:int = max_entries
+        self._lock = threading.RLock()
+        self._cache = collections.OrderedDict()
+        self._cache_state:tuple = ()
+        self._appends:int = 0
+        with span('history.open'):
+            self._connect()
+            self._migrate_schema()
+
+            self._migrate_histfile(self._hist_db_path.with_name(HISTFILE))
     
     def get(self) -> dict:
-        """ Get the current history"""
-        self._load_histfile()
-        return self.history
+        """ Get the current history
+        
+        Returns:
+            {service_url: {item: response}} for every unexpired entry in the
+            history
+        """
+        history:dict = {}
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT service_url, item, response FROM history '
+                'WHERE expires = 0 OR expires > ?',
+                (time.time(),)
+            ).fetchall()
+        for url, item, response in rows:
+            history.setdefault(url, {})[item] = response
+        return history
     
-    def append(self, item:str, url:str, response:str) -> None:
+    def append(
+            self,
+            item:str,
+            url:str,
+            response:str,
+            name:str = '',
+            size:int = 0,
+            expires:float = 0
+        ) -> None:
         """ Append a responded item to the history
-        
+
         Arguments:
             item - The filename or full-url
             url - The URL of the Nullpointer service
             response - The shortened/uploaded URL
+            name - The name the user gave for the item, if different from item
+            size - The size of the item sent, in bytes
+            expires - When the service will delete the item, as a UNIX time
+                (0 if it didn't say)
         """
-        self._load_histfile()
-        try:
-            self.history[url][item] = response
-        except KeyError:
-            self.history[url] = {}
-            self.history[url][item] = response
-        self._save_histfile()
+        now = time.time()
+        with span('history.save'), self._write():
+            self._db.execute(
+                'INSERT OR REPLACE INTO history '
+                '(service_url, item, response, name, created, size, expires, '
+                'used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, item, response, name or item, now, size, expires, now)
+            )
+            self._cache_lookup((url, item), response, expires, now)
+
+            if self._appends % PRUNE_INTERVAL == 0:
+                self._prune(now)
+            self._appends += 1
     
     def find_item_in_history(self, url:str, search:str) -> str:
         """ Finds an item provided to the service in the history.
         
-        If it finds the item, it returns the response value.
+        If it finds the item, it returns the response value. Unlike pop(), the
+        item is left in the history, and marked as used (at most once every
+        TOUCH_INTERVAL, even when the lookup is cached) so that pruning keeps
+        it. If the item has expired, it is removed and '' is returned.
+
+        Arguments:
+            url - The Nullpointer service URL
+            search - The item (or content digest) which was sent
         """
-        url_, item, response = self.pop(url, item=search)
-        return response
+        now = time.time()
+        key = (url, search)
+        with span('history.lookup'), self._lock:
+            self._validate_cache()
+            try:
+                response, expires, used = self._cache[key]
+            except KeyError:
+                row = self._db.execute(
+                    'SELECT response, expires, used FROM history '
+                    'WHERE service_url = ? AND item = ?',
+                    key
+                ).fetchone()
+                if not row:
+                    self._cache_lookup(key, '', 0, 0)
+                    return ''
+                response, expires, used = row
+
+            if 0 < expires <= now:
+                with self._write():
+                    self._db.execute(
+                        'DELETE FROM history '
+                        'WHERE service_url = ? AND item = ?',
+                        key
+                    )
+                    self._cache_lookup(key, '', 0, 0)
+                return ''
+            if response and now - used > TOUCH_INTERVAL:
+                with self._write():
+                    self._db.execute(
+                        'UPDATE history SET used = ? '
+                        'WHERE service_url = ? AND item = ?',
+                        (now,) + key
+                    )
+                used = now
+            self._cache_lookup(key, response, expires, used)
+            return response
+
+    def find_response(self, response:str) -> tuple:
+        """ Find what was sent to get a given response, on any service.
+
+        Arguments:
+            response - The shortened/uploaded URL from Nullpointer
+
+        Returns:
+            (url:str, item:str, name:str) if the response was found, 
+            otherwise ()
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT service_url, item, name FROM history '
+                'WHERE response = ? AND (expires = 0 OR expires > ?)',
+                (response, time.time())
+            ).fetchone()
+        if row:
+            return tuple(row)
+        return ()
+
+    def forget(self, responses:list) -> int:
+        """ Remove the entries for a number of responses from the history.
+
+        Like pop(), this does *NOT* remove anything from Nullpointer.
+
+        Arguments:
+            responses - The shortened/uploaded URLs to remove
+
+        Returns:
+            The number of entries removed
+        """
+        with self._write():
+            cursor = self._db.executemany(
+                'DELETE FROM history WHERE response = ?',
+                [(response,) for response in responses]
+            )
+            self._cache.clear()
+        return cursor.rowcount
 
-        
     def pop(self, url:str, item:str='', response:str='') -> tuple:
         """ Find a specified item from the history and return it.
 
@@ -97,53 +362,361 @@ class NpyHistory:
         the item from Nullpointer!
         
         Arguments:
-            url - The Nullpointer service URL
+            url - The Nullpointer service URL. If this is empty, a response is
+                searched for on any service.
             item - The item text/path which was sent
             response - The shortened/uploaded URL from Nullpointer
         
         Returns:
-            (url:str, response:str, item:str) if the item was found, 
-            otherwise ()
+            (url:str, item:str, response:str) if the item was found, 
+            otherwise (url, '', '')
         """
-        self._load_histfile()
-        r_item:str = ''
-        r_response:str = ''
-        if item:
-            try:
-                r_response = self.history[url].pop(item)
-                r_item = item
-            except KeyError:
-                r_item = ''
-                r_response = ''
-        elif response:
-            for key, value in self.history.items():
-                if response == value:
-                    r_item = key
-                    r_response = self.history[url].pop(r_item)
-        
-        return url, r_item, r_response
+        with self._write():
+            if response and not url:
+                row = self._db.execute(
+                    'SELECT service_url, item, response FROM history '
+                    'WHERE response = ?',
+                    (response,)
+                ).fetchone()
+                if row:
+                    url = row[0]
+                    row = row[1:]
+            elif item:
+                row = self._db.execute(
+                    'SELECT item, response FROM history '
+                    'WHERE service_url = ? AND item = ?',
+                    (url, item)
+                ).fetchone()
+            elif response:
+                row = self._db.execute(
+                    'SELECT item, response FROM history '
+                    'WHERE service_url = ? AND response = ?',
+                    (url, response)
+                ).fetchone()
+            else:
+                row = None
+
+            if not row:
+                return url, '', ''
+
+            self._db.execute(
+                'DELETE FROM history WHERE service_url = ? AND item = ?',
+                (url, row[0])
+            )
+            self._cache.pop((url, row[0]), None)
+        return url, row[0], row[1]
     
     def clear(self, url:str = ''):
         """ Clear all of the history from the file."""
+        with self._write():
+            self._cache.clear()
+            if url:
+                self._db.execute(
+                    'DELETE FROM history WHERE service_url = ?', (url,)
+                )
+                return
+            self._db.execute('DELETE FROM history')
+
+    def search(self, text:str = '') -> list:
+        """ Find the unexpired entries whose name or response contains text.
+
+        Only the IDs of the entries are returned, so that even a very large
+        history can be searched and then shown a page at a time with
+        get_entries().
+
+        Arguments:
+            text - What to search for (default is to find every entry)
+
+        Returns:
+            [entry_id:int], most recently sent first
+        """
+        where, params = self._search(text)
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT rowid FROM history WHERE {where} ORDER BY rowid DESC',
+                params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_entries(self, entry_ids:list) -> dict:
+        """ Get the entries with the given IDs (see search()).
+
+        Returns:
+            {entry_id: (url:str, item:str, response:str, name:str,
+            created:float)} for each entry which still exists
+        """
+        placeholders = ', '.join('?' * len(entry_ids))
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT rowid, service_url, item, response, name, created '
+                f'FROM history WHERE rowid IN ({placeholders})',
+                tuple(entry_ids)
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def unverified(self, before:float, url:str = '') -> list:
+        """ Find the entries which haven't been verified since a given time.
+
+        Arguments:
+            before - The UNIX time to look for verifications since
+            url - Only look at entries for this service (default is all)
+
+        Returns:
+            [(url:str, item:str, response:str)] for each unexpired entry
+        """
+        query = (
+            'SELECT service_url, item, response FROM history '
+            'WHERE verified < ? AND (expires = 0 OR expires > ?)'
+        )
+        params:tuple = (before, time.time())
         if url:
-            self.history[url].clear()
-            self._save_histfile()
+            query += ' AND service_url = ?'
+            params += (url,)
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def mark_verified(self, responses:list, when:float = 0):
+        """ Record that a number of responses were found to still be there.
+
+        Arguments:
+            responses - The shortened/uploaded URLs which were checked
+            when - When they were checked (default is now)
+        """
+        when = when or time.time()
+        with self._write():
+            self._db.executemany(
+                'UPDATE history SET verified = ? WHERE response = ?',
+                [(when, response) for response in responses]
+            )
+
+    def get_digest(self, dev:int, ino:int, size:int, mtime_ns:int) -> str:
+        """ Find the remembered content digest of a file.
+
+        Like history entries, a digest is marked as used again at most once
+        every TOUCH_INTERVAL, so that the ones pruned past MAX_DIGESTS are
+        the least recently used rather than the oldest.
+
+        Arguments:
+            dev, ino, size, mtime_ns - From os.stat() of the file
+
+        Returns:
+            The digest, or '' if none is remembered for the file as it is now
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest, used FROM digests WHERE dev = ? AND ino = ? '
+                'AND size = ? AND mtime_ns = ?',
+                (dev, ino, size, mtime_ns)
+            ).fetchone()
+            if not row:
+                return ''
+            digest, used = row
+            if now - used > TOUCH_INTERVAL:
+                with self._write():
+                    self._db.execute(
+                        'UPDATE digests SET used = ? '
+                        'WHERE dev = ? AND ino = ?',
+                        (now, dev, ino)
+                    )
+        return digest
+
+    def set_digest(
+            self,
+            dev:int,
+            ino:int,
+            size:int,
+            mtime_ns:int,
+            digest:str
+        ) -> None:
+        """ Remember the content digest of a file.
+
+        Only the latest digest of each file is kept; changing the file makes
+        the old one useless anyway.
+
+        Arguments:
+            dev, ino, size, mtime_ns - From os.stat() of the file
+            digest - The digest of its contents
+        """
+        with self._write():
+            self._db.execute(
+                'INSERT OR REPLACE INTO digests '
+                '(dev, ino, size, mtime_ns, digest, used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (dev, ino, size, mtime_ns, digest, time.time())
+            )
+
+    def prune(self) -> int:
+        """ Remove expired entries, and the least recently used entries over
+        max_entries, from the history.
+
+        This also happens every so often as entries are added.
+
+        Returns:
+            The number of entries removed
+        """
+        with self._write():
+            return self._prune(time.time())
+
+    def _prune(self, now:float) -> int:
+        """ Prune the history, within a write transaction"""
+        removed = self._db.execute(
+            'DELETE FROM history WHERE expires > 0 AND expires <= ?', (now,)
+        ).rowcount
+        if self.max_entries:
+            excess = self._db.execute(
+                'SELECT COUNT(*) FROM history'
+            ).fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += self._db.execute(
+                    'DELETE FROM history WHERE rowid IN ('
+                    'SELECT rowid FROM history ORDER BY used LIMIT ?)',
+                    (excess,)
+                ).rowcount
+        if removed:
+            self._cache.clear()
+        self._db.execute(
+            'DELETE FROM digests WHERE rowid IN ('
+            'SELECT rowid FROM digests ORDER BY used DESC LIMIT -1 OFFSET ?)',
+            (MAX_DIGESTS,)
+        )
+        return removed
+
+    @staticmethod
+    def _search(search:str) -> tuple:
+        """ Build a WHERE clause for unexpired entries matching a search.
+
+        Returns:
+            (clause:str, params:tuple)
+        """
+        where = '(expires = 0 OR expires > ?)'
+        params:tuple = (time.time(),)
+        if search:
+            pattern = '%' + (
+                search.replace('\\', '\\\\')
+                .replace('%', '\\%')
+                .replace('_', '\\_')
+            ) + '%'
+            where += (
+                " AND (name LIKE ? ESCAPE '\\' OR response LIKE ? ESCAPE '\\')"
+            )
+            params += (pattern, pattern)
+        return where, params
+
+    @contextlib.contextmanager
+    def _write(self):
+        """ A transaction which will write to the database.
+
+        The database's write lock is taken up front (BEGIN IMMEDIATE) rather
+        than when the first change is made. Otherwise a transaction which
+        reads and then writes, like pop(), could find that another process
+        wrote in between, and fail instead of waiting its turn. The lock is
+        only held for the transaction itself, so other processes can carry
+        on with their own work in the meantime.
+        """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+
+    def _connect(self):
+        """ Open the history database"""
+        self._db = sqlite3.connect(
+            self._hist_db_path,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._cache_state = self._file_state()
+
+    def _file_state(self) -> tuple:
+        """ Get the (inode, data_version) of the database.
+
+        data_version changes whenever another connection commits a change,
+        but not for this connection's own changes.
+        """
+        try:
+            inode = os.stat(self._hist_db_path).st_ino
+        except FileNotFoundError:
+            inode = 0
+        version = self._db.execute('PRAGMA data_version').fetchone()[0]
+        return inode, version
+
+    def _cache_lookup(
+            self,
+            key:tuple,
+            response:str,
+            expires:float,
+            used:float
+        ) -> None:
+        """ Cache a lookup, dropping the least recently used past MAX_CACHED"""
+        self._cache[key] = (response, expires, used)
+        self._cache.move_to_end(key)
+        if len(self._cache) > MAX_CACHED:
+            self._cache.popitem(last=False)
+
+    def _validate_cache(self):
+        """ Drop the lookup cache if another connection changed the database.
+
+        If the database file itself was replaced, reconnect to the new one.
+        """
+        state = self._file_state()
+        if state == self._cache_state:
             return
-        
-        self.history.clear()
-        self._save_histfile()
-        return
-    
-    def _load_histfile(self):
-        """ Load the history file"""
+        self._cache.clear()
+        if state[0] != self._cache_state[0]:
+            self._db.close()
+            self._connect()
+            self._migrate_schema()
+            return
+        self._cache_state = state
+
+    def _migrate_schema(self):
+        """ Bring the database schema up to date."""
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version >= len(MIGRATIONS):
+            return
+
+        # Check again once holding the write lock, in case another process
+        # is migrating the same database.
+        with self._write():
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+            for migration in MIGRATIONS[version:]:
+                for statement in migration.split(';'):
+                    self._db.execute(statement)
+            self._db.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
+
+    def _migrate_histfile(self, hist_file_path:Path):
+        """ Import a JSON history file from older versions into the database.
+
+        The old file is renamed afterwards so that this only happens once.
+        """
         try:
-            with open(self._hist_file_path, mode='r') as hist_file:
-                self.history = json.load(hist_file)
+            with open(hist_file_path, mode='r') as hist_file:
+                old_history = json.load(hist_file)
+        except FileNotFoundError:
+            return
         except json.decoder.JSONDecodeError:
-            self.history = {}
-    
-    def _save_histfile(self):
-        """ Save the history file"""
-        with open(self._hist_file_path, mode='w') as hist_file:
-            json.dump(self.history, hist_file, indent=2)
-                
\ No newline at end of file
+            old_history = {}
+
+        with self._write():
+            for url, items in old_history.items():
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO history '
+                    '(service_url, item, response, name) VALUES (?, ?, ?, ?)',
+                    [
+                        (url, item, response, item)
+                        for item, response in items.items()
+                    ]
+                )
+        try:
+            hist_file_path.rename(hist_file_path.with_suffix('.migrated'))
+        except FileNotFoundError:
+            # Another process migrated it at the same time
+            pass
@@ -0,0 +1,330 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+info - the service's landing page, and the limits it describes
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+from .fileutil import atomic_write
+from .history import get_data_dir
+from .progress import format_size
+from .ratelimit import get_limiter
+from .transport import TransportError, get_transport
+
+INFO_DIR = 'info'
+
+# Seconds before the landing page is checked for changes
+DEFAULT_TTL = 24 * 60 * 60
+
+# Seconds before trying again to fetch a page which couldn't be fetched
+FAILURE_TTL = 5 * 60
+
+# What 0x0.st says, for services whose page doesn't
+DEFAULT_MIN_AGE = 30
+DEFAULT_MAX_AGE = 365
+
+SIZE_UNITS = {'B': 1, 'KiB': 1024, 'MiB': 1024**2, 'GiB': 1024**3}
+MAX_SIZE_PATTERN = re.compile(
+    r'Maximum file size:\s*([\d.]+)\s*(B|KiB|MiB|GiB)', re.IGNORECASE
+)
+MIN_AGE_PATTERN = re.compile(r'at least\s+(\d+)\s+days', re.IGNORECASE)
+# The y axis labels of the retention graph: max_age at the top, min_age at
+# the bottom
+AXIS_PATTERN = re.compile(r'^\s*([\d.]+)\s*\|', re.MULTILINE)
+RETENTION_PATTERN = re.compile(r'^\s*retention\s*=', re.MULTILINE)
+
+class FileTooLarge(Exception):
+    """ A file is bigger than the service accepts."""
+
+class ServiceLimits:
+    """ Limits described on a service's landing page.
+
+    Attributes:
+        max_size(int): The largest file the service accepts, in bytes (0 if
+            the page didn't say)
+        min_age(float): Days the largest files are kept for
+        max_age(float): Days the smallest files are kept for
+        has_retention(bool): Whether the page gave the retention formula
+    """
+
+    def __init__(
+            self,
+            max_size:int = 0,
+            min_age:float = DEFAULT_MIN_AGE,
+            max_age:float = DEFAULT_MAX_AGE,
+            has_retention:bool = False
+        ) -> None:
+        self.max_size = max_size
+        self.min_age = min_age
+        self.max_age = max_age
+        self.has_retention = has_retention
+
+    @classmethod
+    def parse(cls, text:str) -> 'ServiceLimits':
+        """ Read the limits from the text of a landing page."""
+        limits = cls()
+        match = MAX_SIZE_PATTERN.search(text)
+        if match:
+            unit = {name.lower(): size for name, size in SIZE_UNITS.items()}
+            limits.max_size = int(
+                float(match.group(1)) * unit[match.group(2).lower()]
+            )
+        if RETENTION_PATTERN.search(text):
+            limits.has_retention = True
+            axis = [float(label) for label in AXIS_PATTERN.findall(text)]
+            if len(axis) >= 2:
+                limits.max_age, limits.min_age = axis[0], axis[-1]
+        match = MIN_AGE_PATTERN.search(text)
+        if match:
+            limits.min_age = float(match.group(1))
+        return limits
+
+    def retention(self, size:int) -> float:
+        """ How many days the service will keep a file of a given size.
+
+        Returns 0 if the service didn't say.
+        """
+        if not (self.has_retention and self.max_size):
+            return 0
+        return self.min_age + (self.min_age - self.max_age) * (
+            min(size, self.max_size) / self.max_size - 1
+        ) ** 3
+
+    def check_size(self, size:int):
+        """ Make sure a file isn't too big for the service.
+
+        Raises:
+            FileTooLarge if it is
+        """
+        if self.max_size and size > self.max_size:
+            raise FileTooLarge(
+                f'{format_size(size)} is larger than the service allows '
+                f'({format_size(self.max_size)})'
+            )
+
+class ServiceInfo:
+    """ A service's landing page, as last fetched.
+
+    Attributes:
+        url(str): The URL of the service
+        text(str): The landing page
+        etag(str): The page's ETag header, if any
+        last_modified(str): The page's Last-Modified header, if any
+        fetched(float): When the page was last fetched or found unchanged
+        limits(ServiceLimits): The limits described on the page
+    """
+
+    def __init__(
+            self,
+            url:str,
+            text:str = '',
+            etag:str = '',
+            last_modified:str = '',
+            fetched:float = 0
+        ) -> None:
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = fetched
+        self.limits = ServiceLimits.parse(text)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'url': self.url,
+            'text': self.text,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched': self.fetched,
+        })
+
+_info_cache = None
+_info_cache_lock = threading.Lock()
+
+def get_info_cache() -> 'InfoCache':
+    """ Get the InfoCache shared by everything in this process."""
+    global _info_cache
+    with _info_cache_lock:
+        if not _info_cache:
+            _info_cache = InfoCache()
+        return _info_cache
+
+class InfoCache:
+    """ Service landing pages, cached on disk.
+
+    Pages are kept in the data directory, one file per service, and in
+    memory. Once a page is older than ttl it's fetched again with
+    If-None-Match/If-Modified-Since, so an unchanged page costs a 304 rather
+    than the whole page. If the service can't be reached, the old page is
+    used until it can; either way, it isn't tried again for failure_ttl.
+    Fetches go through the shared RequestLimiter like any other request.
+
+    Attributes:
+        ttl(float): Seconds before checking whether a page has changed
+        failure_ttl(float): Seconds before trying again to fetch a page
+            which couldn't be fetched
+        transport(Transport): The transport to fetch pages with
+    """
+
+    def __init__(
+            self,
+            directory=None,
+            ttl:float = DEFAULT_TTL,
+            transport=None,
+            failure_ttl:float = FAILURE_TTL
+        ) -> None:
+        self.directory = directory or get_data_dir() / INFO_DIR
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.transport = transport or get_transport()
+        self._infos:dict = {}
+        # {url: (time.time() of the failure, error)}
+        self._failures:dict = {}
+        self._lock = threading.Lock()
+
+    def get(
+            self,
+            url:str,
+            refresh:bool = False,
+            transport=None
+        ) -> ServiceInfo:
+        """ Get the landing page for a service.
+
+        Arguments:
+            url - The URL of the service
+            refresh - Check for changes even if the page is younger than ttl
+            transport - The Transport to fetch the page with, if it needs
+                fetching (default is the cache's own)
+
+        Raises:
+            TransportError if the page couldn't be fetched and isn't cached
+        """
+        now = time.time()
+        with self._lock:
+            info = self._infos.get(url) or self._load(url)
+            failed, error = self._failures.get(url, (0, ''))
+        if not refresh:
+            if info and now - info.fetched < self.ttl:
+                return info
+            if now - failed < self.failure_ttl:
+                if info:
+                    return info
+                raise TransportError(error)
+
+        try:
+            info = self._fetch(url, info, transport or self.transport)
+        except TransportError as err:
+            with self._lock:
+                self._failures[url] = (time.time(), str(err))
+            if info:
+                return info
+            raise
+
+        with self._lock:
+            self._failures.pop(url, None)
+            self._infos[url] = info
+            self._save(info)
+        return info
+
+    def limits(self, url:str, transport=None) -> ServiceLimits:
+        """ Get the limits for a service, or no limits if they're unknown.
+
+        Arguments:
+            url - The URL of the service
+            transport - The Transport to fetch the page with, as for get()
+        """
+        try:
+            return self.get(url, transport=transport).limits
+        except TransportError:
+            return ServiceLimits()
+
+    def _fetch(self, url:str, info, transport) -> ServiceInfo:
+        """ Fetch the landing page for a service, if it has changed.
+
+        Arguments:
+            url - The URL of the service
+            info - The cached page, if any
+            transport - The Transport to fetch it with
+
+        Raises:
+            TransportError if the page couldn't be fetched
+        """
+        headers = {}
+        if info and info.etag:
+            headers['If-None-Match'] = info.etag
+        if info and info.last_modified:
+            headers['If-Modified-Since'] = info.last_modified
+        with get_limiter().slot(url) as slot:
+            request = transport.request('GET', url, headers=headers)
+            slot.finish(request.status, getattr(request, 'timings', None))
+
+        if request.status == 304 and info:
+            info.fetched = time.time()
+            return info
+        if request.status == 200:
+            return ServiceInfo(
+                url,
+                request.data.decode('UTF-8', errors='replace').strip(),
+                request.headers.get('ETag', ''),
+                request.headers.get('Last-Modified', ''),
+                time.time()
+            )
+        raise TransportError(f'{request.status} {request.reason}')
+
+    def _path(self, url:str):
+        name = hashlib.sha256(url.encode('UTF-8')).hexdigest()[:32]
+        return self.directory / f'{name}.json'
+
+    def _load(self, url:str):
+        """ Read the cached page for a service, if there is one."""
+        try:
+            with open(self._path(url), mode='r') as info_file:
+                fields = json.load(info_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return None
+        try:
+            info = ServiceInfo(**fields)
+        except TypeError:
+            return None
+        if info.url != url:
+            return None
+        self._infos[url] = info
+        return info
+
+    def _save(self, info:ServiceInfo):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write(self._path(info.url), info.to_json())
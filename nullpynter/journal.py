@@ -0,0 +1,187 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+journal - on-disk record of requests which failed
+"""
+
+import contextlib
+import json
+import os
+import time
+
+from .fileutil import locked
+from .history import get_data_dir
+
+JOURNALFILE = 'failed'
+
+class FailureJournal:
+    """ A journal of requests which still failed after being retried.
+
+    Each failure is appended as one line of JSON, so recording one is cheap
+    and doesn't depend on how many are already in the journal. The failed
+    items can be replayed later with `npy retry`.
+    """
+
+    def __init__(self) -> None:
+        self._journal_path = get_data_dir() / JOURNALFILE
+
+    def record(self, verb:str, item:str, url:str, error:str) -> None:
+        """ Record a failed request.
+
+        Arguments:
+            verb - The form field the item was sent as (e.g. 'file')
+            item - The filename or URL which was sent
+            url - The URL of the Nullpointer service
+            error - A description of the failure
+        """
+        if verb == 'file':
+            item = os.path.abspath(item)
+        entry = {
+            'verb': verb,
+            'item': item,
+            'url': url,
+            'error': error,
+            'time': time.time(),
+        }
+        with locked(self._journal_path):
+            with open(self._journal_path, mode='a') as journal_file:
+                journal_file.write(json.dumps(entry) + '\n')
+
+    def get(self) -> list:
+        """ Get the failures in the journal, oldest first."""
+        try:
+            with locked(self._journal_path, shared=True):
+                with open(self._journal_path, mode='r') as journal_file:
+                    return self._parse(journal_file)
+        except FileNotFoundError:
+            return []
+
+    @contextlib.contextmanager
+    def replay(self):
+        """ Take the failures out of the journal to replay them.
+
+        The block is given a Replay holding the failures. Each one should be
+        passed to its done() once it's been sent again, whether or not that
+        worked; anything which fails again is recorded afresh. Failures which
+        aren't done when the block exits (because the replay was
+        interrupted, say) are put back in the journal. If the process dies
+        without getting that far, they're put back by the next replay.
+        """
+        taken_path = self._journal_path.with_name(
+            f'{JOURNALFILE}.{os.getpid()}'
+        )
+        # Nothing can be half-way through appending while this holds the
+        # lock, so nothing is lost by moving the journal aside.
+        with locked(self._journal_path):
+            self._recover()
+            try:
+                os.rename(self._journal_path, taken_path)
+            except FileNotFoundError:
+                taken_path = None
+        if not taken_path:
+            yield Replay([])
+            return
+        with open(taken_path, mode='r') as journal_file:
+            replay = Replay(self._parse(journal_file))
+        try:
+            yield replay
+        finally:
+            with locked(self._journal_path):
+                self._append(replay.remaining, self._journal_path)
+                os.unlink(taken_path)
+
+    def _recover(self) -> None:
+        """ Put back failures taken by replays whose process has died.
+
+        The journal lock must be held.
+        """
+        prefix = f'{JOURNALFILE}.'
+        for path in self._journal_path.parent.glob(f'{prefix}*'):
+            pid = path.name[len(prefix):]
+            if not pid.isdigit() or _is_running(int(pid)):
+                continue
+            with open(path, mode='r') as journal_file:
+                self._append(self._parse(journal_file), self._journal_path)
+            os.unlink(path)
+
+    @staticmethod
+    def _append(entries:list, path) -> None:
+        """ Append entries to a journal file."""
+        if not entries:
+            return
+        with open(path, mode='a') as journal_file:
+            journal_file.writelines(
+                json.dumps(entry) + '\n' for entry in entries
+            )
+
+    def _parse(self, journal_file) -> list:
+        """ Parse the entries of a journal, skipping any damaged lines."""
+        entries = []
+        for line in journal_file:
+            try:
+                entries.append(json.loads(line))
+            except json.decoder.JSONDecodeError:
+                continue
+        return entries
+
+class Replay:
+    """ Failures taken out of the journal to be sent again.
+
+    Attributes:
+        entries(list): The failures, oldest first
+    """
+
+    def __init__(self, entries:list) -> None:
+        self.entries = entries
+        self._done:set = set()
+
+    def done(self, verb:str, item:str) -> None:
+        """ Note that an item has been sent again."""
+        self._done.add((verb, item))
+
+    @property
+    def remaining(self) -> list:
+        """list: The failures which haven't been sent again yet."""
+        return [
+            entry for entry in self.entries
+            if (entry['verb'], entry['item']) not in self._done
+        ]
+
+def _is_running(pid:int) -> bool:
+    """ Check whether a process is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
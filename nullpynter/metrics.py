@@ -0,0 +1,289 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+metrics - results of requests, and statistics about them
+"""
+
+import atexit
+import json
+import threading
+import time
+
+from . import config
+from .fileutil import atomic_write, locked
+from .history import get_data_dir
+
+STATSFILE = 'stats.json'
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+PHASES = ('total', 'connect', 'tls', 'send', 'wait')
+
+# Phases which only some requests go through: a kept-alive connection is
+# already connected, and plain HTTP has no TLS handshake. These are only
+# observed for requests which spent time on them, so that the others don't
+# drag their means and quantiles towards zero.
+OPTIONAL_PHASES = ('connect', 'tls')
+
+# Statistics are merged into the stats file after this many requests or
+# seconds, and when the process exits.
+FLUSH_COUNT = 100
+FLUSH_INTERVAL = 60
+
+class RequestResult:
+    """ The outcome of a single request (including any retries).
+
+    Attributes:
+        verb(str): The form field the item was sent as (e.g. 'file')
+        item(str): The item which was sent
+        service_url(str): The URL of the Nullpointer service
+        response(str): The response from the service
+        status(int): The HTTP status of the last attempt (0 if the service
+            couldn't be reached or the item was in the history)
+        headers(dict): The headers of the last response
+        attempts(int): How many times the request was sent
+        bytes_sent(int): Bytes written over all attempts, including headers
+        timings(RequestTimings): Where the time went in the last attempt
+        cache_hit(bool): Whether the response came from the history
+        error(str): Why the request failed, if it did
+    """
+
+    def __init__(self, verb:str, item:str, service_url:str) -> None:
+        self.verb = verb
+        self.item = item
+        self.service_url = service_url
+        self.response:str = ''
+        self.status:int = 0
+        self.headers:dict = {}
+        self.attempts:int = 0
+        self.bytes_sent:int = 0
+        self.timings = None
+        self.cache_hit:bool = False
+        self.error:str = ''
+
+    def as_dict(self) -> dict:
+        fields = dict(vars(self))
+        if self.timings:
+            fields['timings'] = self.timings.as_dict()
+        return fields
+
+def empty_stats() -> dict:
+    """ Statistics for no requests at all"""
+    return {
+        'requests': {},
+        'cache_hits': {},
+        'bytes_sent': {},
+        'latency': {
+            phase: {
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                'sum': 0.0,
+                'count': 0,
+            }
+            for phase in PHASES
+        },
+    }
+
+def merge_stats(stats:dict, other:dict) -> dict:
+    """ Add the statistics in other to stats"""
+    for name in ('requests', 'cache_hits', 'bytes_sent'):
+        for key, value in other.get(name, {}).items():
+            stats[name][key] = stats[name].get(key, 0) + value
+    for phase, histogram in other.get('latency', {}).items():
+        if phase not in stats['latency']:
+            continue
+        merged = stats['latency'][phase]
+        if len(histogram['buckets']) == len(merged['buckets']):
+            merged['buckets'] = [
+                count + more
+                for count, more in zip(merged['buckets'], histogram['buckets'])
+            ]
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+    return stats
+
+def histogram_quantile(histogram:dict, quantile:float) -> float:
+    """ Estimate a quantile from a latency histogram.
+
+    Returns:
+        The upper bound of the bucket the quantile falls in (inf if it's in
+        the last bucket, 0 if the histogram is empty)
+    """
+    rank = quantile * histogram['count']
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+        cumulative += count
+        if cumulative and cumulative >= rank:
+            return bound
+    return float('inf') if histogram['count'] else 0
+
+def format_prometheus(stats:dict) -> str:
+    """ Format statistics for the Prometheus node_exporter textfile
+    collector.
+    """
+    lines = [
+        '# HELP nullpynter_requests_total Requests sent to the service.',
+        '# TYPE nullpynter_requests_total counter',
+    ]
+    for key, count in sorted(stats['requests'].items()):
+        verb, status = key.split(' ')
+        lines.append(
+            f'nullpynter_requests_total{{verb="{verb}",status="{status}"}} '
+            f'{count}'
+        )
+    for name, description in (
+            ('cache_hits', 'Items found in the history instead of sent.'),
+            ('bytes_sent', 'Bytes sent to the service.')):
+        lines.append(f'# HELP nullpynter_{name}_total {description}')
+        lines.append(f'# TYPE nullpynter_{name}_total counter')
+        for verb, count in sorted(stats[name].items()):
+            lines.append(f'nullpynter_{name}_total{{verb="{verb}"}} {count}')
+
+    lines.append(
+        '# HELP nullpynter_request_duration_seconds Time spent on each part '
+        'of a request.'
+    )
+    lines.append('# TYPE nullpynter_request_duration_seconds histogram')
+    metric = 'nullpynter_request_duration_seconds'
+    for phase, histogram in stats['latency'].items():
+        cumulative = 0
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        for bound, count in zip(bounds, histogram['buckets']):
+            cumulative += count
+            lines.append(
+                f'{metric}_bucket{{phase="{phase}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(f'{metric}_sum{{phase="{phase}"}} {histogram["sum"]}')
+        lines.append(f'{metric}_count{{phase="{phase}"}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> 'Metrics':
+    """ Get the Metrics shared by everything in this process."""
+    global _metrics
+    with _metrics_lock:
+        if not _metrics:
+            _metrics = Metrics()
+        return _metrics
+
+class Metrics:
+    """ Statistics about the requests made, across runs.
+
+    Results are added up in memory as they're recorded, and every so often
+    (and at exit) merged into a stats file in the data directory, so
+    recording a result doesn't cost any I/O. If the prometheus_textfile
+    setting is a path, the totals are also written there for the node
+    exporter each time they're saved.
+    """
+
+    def __init__(self, stats_path=None) -> None:
+        self._stats_path = stats_path or get_data_dir() / STATSFILE
+        self._pending = empty_stats()
+        self._pending_count:int = 0
+        self._flushed:float = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, result:RequestResult):
+        """ Add the result of a request to the statistics"""
+        with self._lock:
+            stats = self._pending
+            if result.cache_hit:
+                stats['cache_hits'][result.verb] = (
+                    stats['cache_hits'].get(result.verb, 0) + 1
+                )
+            else:
+                key = f'{result.verb} {result.status}'
+                stats['requests'][key] = stats['requests'].get(key, 0) + 1
+                stats['bytes_sent'][result.verb] = (
+                    stats['bytes_sent'].get(result.verb, 0) + result.bytes_sent
+                )
+                if result.timings:
+                    for phase in PHASES:
+                        seconds = getattr(result.timings, phase)
+                        if seconds or phase not in OPTIONAL_PHASES:
+                            self._observe(phase, seconds)
+            self._pending_count += 1
+            due = (
+                self._pending_count >= FLUSH_COUNT
+                or time.monotonic() - self._flushed >= FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def get(self) -> dict:
+        """ Get the statistics saved so far, plus any not yet saved"""
+        with self._lock:
+            return merge_stats(self._load(), self._pending)
+
+    def flush(self):
+        """ Merge the statistics recorded in memory into the stats file"""
+        with self._lock:
+            if not self._pending_count:
+                return
+            pending = self._pending
+            self._pending = empty_stats()
+            self._pending_count = 0
+            self._flushed = time.monotonic()
+            with locked(self._stats_path):
+                stats = merge_stats(self._load(), pending)
+                atomic_write(self._stats_path, json.dumps(stats))
+        textfile = config.get('prometheus_textfile')
+        if textfile:
+            atomic_write(textfile, format_prometheus(stats))
+
+    def clear(self):
+        """ Throw away all of the statistics"""
+        with self._lock:
+            self._pending = empty_stats()
+            self._pending_count = 0
+            with locked(self._stats_path):
+                atomic_write(self._stats_path, json.dumps(empty_stats()))
+
+    def _observe(self, phase:str, seconds:float):
+        histogram = self._pending['latency'][phase]
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            index = len(LATENCY_BUCKETS)
+        histogram['buckets'][index] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+    def _load(self) -> dict:
+        try:
+            with open(self._stats_path, mode='r') as stats_file:
+                return merge_stats(empty_stats(), json.load(stats_file))
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return empty_stats()
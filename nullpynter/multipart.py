@@ -0,0 +1,145 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+multipart - streaming multipart/form-data encoder for file uploads
+"""
+
+import binascii
+import mimetypes
+import os
+
+from .profiling import span
+
+# The size of each chunk read from disk and handed to the connection.
+CHUNK_SIZE = 64 * 1024
+
+# Characters escaped in Content-Disposition parameters, as browsers (and
+# urllib3's own multipart encoder) do
+PARAM_ESCAPES = {ord('\n'): '%0A', ord('\r'): '%0D', ord('"'): '%22'}
+
+def format_header_param(name:str, value:str) -> str:
+    """ Format and quote a Content-Disposition parameter.
+
+    This follows the WHATWG HTML standard, like
+    urllib3.fields.format_multipart_header_param() (which isn't used so that
+    urllib3 needn't be imported just to build a body).
+
+    Returns:
+        'name="value"' with the value escaped
+    """
+    return f'{name}="{value.translate(PARAM_ESCAPES)}"'
+
+class MultipartEncoder:
+    """ Encodes a single file as a multipart/form-data request body.
+
+    Rather than reading the whole file into memory, the body is produced as a
+    generator over fixed-size chunks read from the file. Since the size of the
+    file is known ahead of time, so is the size of the body, which allows the
+    request to be sent with a regular Content-Length instead of chunked
+    transfer encoding. Peak memory stays at roughly one chunk regardless of
+    the size of the file.
+
+    Attributes:
+        field(str): The form field to send the file as (e.g. 'file')
+        path(str): The path of the file on disk
+        chunk_size(int): The number of bytes to read from the file at a time
+        boundary(str): The multipart boundary to use
+        progress(Progress): If set, advanced as each chunk is sent
+    """
+
+    def __init__(
+            self,
+            field:str,
+            path:str,
+            chunk_size:int = CHUNK_SIZE,
+            boundary:str = '',
+            progress=None
+        ) -> None:
+        self.field = field
+        self.path = path
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.boundary = boundary or binascii.hexlify(os.urandom(16)).decode()
+
+        filename = os.path.basename(path)
+        content_type = (
+            mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        self._preamble = (
+            f'--{self.boundary}\r\n'
+            'Content-Disposition: form-data; '
+            f'{format_header_param("name", field)}; '
+            f'{format_header_param("filename", filename)}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            '\r\n'
+        ).encode('UTF-8')
+        self._epilogue = f'\r\n--{self.boundary}--\r\n'.encode('UTF-8')
+        self._file_size = os.path.getsize(path)
+
+    @property
+    def content_type(self) -> str:
+        """str: The Content-Type header value for this body."""
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    @property
+    def headers(self) -> dict:
+        """dict: The headers required to send this body."""
+        return {
+            'Content-Type': self.content_type,
+            'Content-Length': str(len(self)),
+        }
+
+    def __len__(self) -> int:
+        return len(self._preamble) + self._file_size + len(self._epilogue)
+
+    def __iter__(self):
+        """ Yield the encoded body one chunk at a time.
+
+        When the consumer asks for the next chunk, the previous one has been
+        sent, so that is when progress is advanced.
+        """
+        for chunk in self._chunks():
+            yield chunk
+            if self.progress:
+                self.progress.advance(len(chunk))
+
+    def _chunks(self):
+        """ Generate the chunks of the body."""
+        yield self._preamble
+        with open(self.path, mode='rb') as upload_file:
+            while True:
+                with span('file.read'):
+                    chunk = upload_file.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        yield self._epilogue
@@ -33,12 +33,17 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 nullrequest.py - base class for any requests to the service
 """
 
-import urllib
-import urllib3
+import time
 
-http = urllib3.PoolManager()
+from .history import get_history, parse_expires
+from .metrics import RequestResult, get_metrics
+from .profiling import span
+from .ratelimit import get_limiter
+from .retry import RETRY_STATUSES, RetryPolicy
+from .transport import TransportError, get_transport
 
-from .history import NpyHistory
+class RequestFailed(Exception):
+    """ A request still failed after it was retried."""
 
 class NullRequest:
     """nullrequest - base class for requests to the service
@@ -46,23 +51,46 @@ class NullRequest:
     Attributes:
         service_url(int): The url for the null pointer service to use (default:
             'http://0x0.st')
+        transport (Transport): The transport to send requests with
+        retry_policy (RetryPolicy): How to retry requests which fail
+        progress_callback: If set, called with a Progress object as the
+            request body is sent (uploads only)
+        endpoints (EndpointPool): If set, the services to spread requests
+            over and fail over between, instead of service_url
+        limiter (RequestLimiter): What keeps requests within what the
+            service will take. Requests share a process-wide one by default.
         request_params (dict): The fields and values for the formdata to send
         request_data (bytes): The message (usually URL or error) returned by 
             the service.
+        result (RequestResult): The details of the last request sent
     """
     verb = "null"
+    progress_callback = None
+    endpoints = None
+    limiter = None
 
-    def __init__(self, service_url: str = 'http://0x0.st'):
+    def __init__(
+            self,
+            service_url: str = 'http://0x0.st',
+            transport=None,
+            retry_policy=None
+        ):
         """Class constructor
         
         Arguments: 
             service_url(int): The URL for the nullpointer service to use. 
+            transport(Transport): The transport to send requests with.
+                Requests share a process-wide transport by default.
+            retry_policy(RetryPolicy): How to retry requests which fail
         """
         self.service_url: str = service_url
+        self.transport = transport or get_transport()
+        self.retry_policy = retry_policy or RetryPolicy()
         self.request_params: dict = {}
         self.request_data: str
         self.item: str
-        self.history = NpyHistory()
+        self.result = None
+        self._history = None
     
     def set_request_params(self, data):
         """ Sets up the request parameters
@@ -75,28 +103,225 @@ class NullRequest:
     def send_request(self):
         """Sends the request out to the service.
         
+        Connection failures and responses which suggest trying later (such as
+        429 or 503) are retried according to retry_policy. If the request
+        still fails after that, it's recorded in the failure journal so that
+        it can be retried later with `npy retry`.
+
+        The details of the request (status, headers, timings and so on) are
+        kept in result and added to the statistics shown by `npy stats`.
+
         Returns:
             The response from the service (usually the URL or an error)
+
+        Raises:
+            RequestFailed if the request failed on every attempt, or whatever
+            check_request() raises
         """
-        item_in_history = self.history.find_item_in_history(self.item)
-        if item_in_history:
-            self.request_data = item_in_history
+        self.result = RequestResult(self.verb, self.item, self.service_url)
+        try:
+            return self._send_request()
+        finally:
+            # Requests rejected by check_request() never got anywhere
+            if self.result.cache_hit or self.result.attempts:
+                get_metrics().record(self.result)
+
+    def _send_request(self):
+        """ Look the item up in the history, or else send it"""
+        if self.endpoints:
+            service_urls = self.endpoints.ranked()
         else:
-            request = http.request(
-                'POST',
-                self.service_url,
-                fields = self.request_params
+            service_urls = [self.service_url]
+        for service_url in service_urls:
+            item_in_history = self.history.find_item_in_history(
+                service_url,
+                self.history_key
             )
-            self.request_data = request.data.decode('UTF-8').strip()
+            if item_in_history:
+                self.service_url = service_url
+                self.result.service_url = service_url
+                self.request_data = item_in_history
+                self.result.response = item_in_history
+                self.result.cache_hit = True
+                return self.request_data
+
+        self.service_url = service_urls[0]
+        self.check_request()
+        if self.endpoints:
+            request = self._request_with_failover(service_urls)
+        else:
+            request = self._request_with_retries()
+        self.request_data = request.data.decode('UTF-8').strip()
+        self.result.response = self.request_data
+        self.result.headers = dict(request.headers)
 
         if self.request_data.startswith('http'):
-            item = self.item
+            item = self.history_key
             url = self.service_url
             response = self.request_data
-            print((item, url, response))
-            self.history.append(item, url, response)
+            self.history.append(
+                item,
+                url,
+                response,
+                name=self.item,
+                size=self.item_size,
+                expires=parse_expires(request.headers.get('X-Expires'))
+            )
         return self.request_data
     
+    @property
+    def history(self):
+        """NpyHistory: The history, opened the first time it's needed."""
+        if not self._history:
+            self._history = get_history()
+        return self._history
+
+    @property
+    def history_key(self) -> str:
+        """str: The key this request's item is recorded under in the history."""
+        return self.item
+
+    @property
+    def item_size(self) -> int:
+        """int: The size of this request's item, in bytes."""
+        return len(self.item.encode('UTF-8'))
+
+    def check_request(self):
+        """ Check that the request can be sent, before sending it.
+
+        Subclasses can override this to raise an exception for requests the
+        service is sure to reject.
+        """
+
+    def _request_with_failover(self, service_urls:list):
+        """ Perform the request, trying each of the given services in turn.
+
+        Every service but the last gets a single attempt, so that a service
+        which is down or overloaded is skipped rather than retried; the last
+        is retried as long as retry_policy allows. After a failure the
+        services left are ranked afresh, so one which other requests have
+        found to be down meanwhile is tried last rather than next. The
+        service which handled the request is left in service_url.
+
+        Arguments:
+            service_urls(list): The services to try, best first
+
+        Returns:
+            The urllib3 response from the service.
+        """
+        tried:set = set()
+        while len(tried) < len(service_urls):
+            if tried:
+                service_url = next(
+                    url for url in self.endpoints.ranked()
+                    if url not in tried
+                )
+            else:
+                service_url = service_urls[0]
+            tried.add(service_url)
+            last = len(tried) == len(service_urls)
+            self.service_url = service_url
+            self.result.service_url = service_url
+            self.endpoints.started(service_url)
+            seconds = 0
+            failed = False
+            start = time.monotonic()
+            try:
+                request = self._request_with_retries(failover=not last)
+                seconds = self._latency(start, self.result.timings)
+                return request
+            except RequestFailed:
+                failed = True
+                if last:
+                    raise
+            finally:
+                self.endpoints.finished(service_url, seconds, failed)
+        raise RequestFailed('No services to send the request to')
+
+    def _request_with_retries(self, failover:bool = False):
+        """ Perform the request, retrying it as long as retry_policy allows.
+
+        Arguments:
+            failover(bool): Whether another service will be tried if this
+                one fails. If so, the request is only attempted once and
+                isn't recorded in the failure journal.
+
+        Returns:
+            The urllib3 response from the service.
+        """
+        result = self.result or RequestResult(
+            self.verb, self.item, self.service_url
+        )
+        limiter = self.limiter or get_limiter()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = ''
+            result.attempts = attempt
+            with limiter.slot(self.service_url) as slot:
+                try:
+                    with span('request.send'):
+                        request = self._request()
+                except TransportError as err:
+                    status = 0
+                    error = str(err)
+                    result.timings = None
+                else:
+                    status = request.status
+                    result.timings = getattr(request, 'timings', None)
+                    if result.timings:
+                        result.bytes_sent += result.timings.bytes_sent
+                    retry_after = request.headers.get('Retry-After', '')
+                    slot.finish(status, result.timings, retry_after)
+                    if status not in RETRY_STATUSES:
+                        result.status = status
+                        result.error = ''
+                        return request
+                    error = f'{status} {request.reason}'
+            result.status = status
+            result.error = error
+
+            if failover:
+                raise RequestFailed(error)
+            if not self.retry_policy.should_retry(attempt, status):
+                #pylint: disable=import-outside-toplevel
+                from .journal import FailureJournal
+                FailureJournal().record(
+                    self.verb, self.item, self.service_url, error
+                )
+                raise RequestFailed(error)
+            time.sleep(self.retry_policy.delay(attempt, retry_after))
+
+    @staticmethod
+    def _latency(start:float, timings) -> float:
+        """ How long the service took to respond to a request.
+
+        The time spent sending the body is left out when it's known, since
+        it depends on the item more than on the service.
+
+        Arguments:
+            start(float): The time.monotonic() when the request was made
+            timings(RequestTimings): The timings of the request, if any
+        """
+        if timings and timings.total:
+            return max(timings.latency, 0.001)
+        return max(time.monotonic() - start, 0.001)
+
+    def _request(self):
+        """ Perform the actual HTTP request to the service.
+
+        Subclasses which need to send something other than plain form fields
+        can override this.
+
+        Returns:
+            The urllib3 response from the service.
+        """
+        return self.transport.request(
+            'POST',
+            self.service_url,
+            fields = self.request_params
+        )
+
     @property
     def service_url(self):
         """int: the URL for the service to use."""
@@ -0,0 +1,203 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+profiling - optional profiling of whole runs and named spans within them
+"""
+
+import atexit
+import contextlib
+import os
+import sys
+import threading
+import time
+
+# Modes for start(), or the NPY_PROFILE environment variable
+MODES = ('cpu', 'memory', 'all')
+
+# Frames kept for each allocation traced by tracemalloc
+TRACEMALLOC_FRAMES = 25
+
+_NOT_PROFILING = contextlib.nullcontext()
+
+_mode:str = ''
+_output:str = ''
+_profilers:list = []
+_spans:dict = {}
+_spans_lock = threading.Lock()
+
+class Span:
+    """ Times a named section of code, and counts memory allocated in it.
+
+    Use span() rather than creating these, so that nothing is measured (and
+    next to nothing is spent) unless profiling is on.
+    """
+
+    def __init__(self, name:str) -> None:
+        self.name = name
+        self._start:float = 0
+        self._memory:int = 0
+
+    def __enter__(self):
+        if _mode != 'cpu':
+            import tracemalloc #pylint: disable=import-outside-toplevel
+            self._memory = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        allocated = 0
+        if _mode != 'cpu':
+            import tracemalloc #pylint: disable=import-outside-toplevel
+            allocated = tracemalloc.get_traced_memory()[0] - self._memory
+        with _spans_lock:
+            stats = _spans.setdefault(
+                self.name,
+                {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'bytes': 0}
+            )
+            stats['count'] += 1
+            stats['seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            stats['bytes'] += allocated
+        return False
+
+def span(name:str):
+    """ Measure a named section of code, if profiling is on:
+
+        with span('history.save'):
+            ...
+
+    Allocations are counted for the whole process while the span is open,
+    so with several threads busy they're only a rough guide.
+    """
+    if not _mode:
+        return _NOT_PROFILING
+    return Span(name)
+
+def start(mode:str = 'all', output:str = ''):
+    """ Start profiling the process, until it exits or stop() is called.
+
+    Arguments:
+        mode - 'cpu' for cProfile, 'memory' for tracemalloc or 'all' for both
+        output - The path to write results to, without an extension
+            (default is npy-<pid> in the current directory)
+    """
+    global _mode, _output
+    if mode not in MODES:
+        raise ValueError(f'Unknown profiling mode {mode}')
+    if _mode:
+        return
+    _mode = mode
+    _output = output or f'npy-{os.getpid()}'
+
+    #pylint: disable=import-outside-toplevel
+    if mode != 'memory':
+        import cProfile
+        profiler = cProfile.Profile()
+        _profilers.append(profiler)
+        # Profile each thread started from now on, as well as this one
+        threading.setprofile(_profile_thread)
+        profiler.enable()
+    if mode != 'cpu':
+        import tracemalloc
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    atexit.register(stop)
+
+def start_from_env():
+    """ Start profiling if the NPY_PROFILE environment variable is set.
+
+    NPY_PROFILE is the mode (or 1 for all), and NPY_PROFILE_OUTPUT is the
+    path to write to.
+    """
+    mode = os.environ.get('NPY_PROFILE', '')
+    if mode:
+        start(
+            'all' if mode == '1' else mode,
+            os.environ.get('NPY_PROFILE_OUTPUT', '')
+        )
+
+def stop():
+    """ Stop profiling and write out the results.
+
+    Writes <output>.pstats (for pstats or snakeviz), <output>.tracemalloc
+    (a tracemalloc.Snapshot) and <output>.spans.json, depending on the mode,
+    and a summary of the spans to stderr.
+    """
+    global _mode
+    if not _mode:
+        return
+    #pylint: disable=import-outside-toplevel
+    import json
+    written = []
+    if _profilers:
+        import pstats
+        threading.setprofile(None)
+        _profilers[0].disable()
+        stats = pstats.Stats(*_profilers)
+        stats.dump_stats(f'{_output}.pstats')
+        written.append(f'{_output}.pstats')
+        _profilers.clear()
+    if _mode != 'cpu':
+        import tracemalloc
+        tracemalloc.take_snapshot().dump(f'{_output}.tracemalloc')
+        tracemalloc.stop()
+        written.append(f'{_output}.tracemalloc')
+    with _spans_lock:
+        spans = dict(_spans)
+    with open(f'{_output}.spans.json', mode='w') as spans_file:
+        json.dump(spans, spans_file, indent=2)
+    written.append(f'{_output}.spans.json')
+    _mode = ''
+
+    for name, stats in sorted(
+            spans.items(), key=lambda item: -item[1]['seconds']):
+        print(
+            f'npy profile: {name}: {stats["count"]} x, '
+            f'{stats["seconds"]:.3f}s total, '
+            f'{stats["max_seconds"]:.3f}s max, '
+            f'{stats["bytes"] / 1024:.0f} KiB allocated',
+            file=sys.stderr
+        )
+    print(f'npy profile: wrote {", ".join(written)}', file=sys.stderr)
+
+def _profile_thread(*args):
+    """ Start a profiler for a new thread (see threading.setprofile())"""
+    #pylint: disable=import-outside-toplevel
+    import cProfile
+    sys.setprofile(None)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Only one profiler can be active at a time in newer Pythons
+        return
+    _profilers.append(profiler)
@@ -0,0 +1,232 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+progress - tracking the progress of uploads
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Minimum time between callbacks, in seconds
+DEFAULT_INTERVAL = 0.1
+
+# How quickly the instantaneous rate follows changes (0-1, higher is faster)
+RATE_SMOOTHING = 0.3
+
+def format_size(size:float) -> str:
+    """ Format a number of bytes for display (e.g. '12.3 MiB')."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024 or unit == 'GiB':
+            break
+        size /= 1024
+    if unit == 'B':
+        return f'{int(size)} B'
+    return f'{size:.1f} {unit}'
+
+def format_duration(seconds:float) -> str:
+    """ Format a number of seconds for display (e.g. '1:02:03' or '2:03')."""
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f'{hours}:{minutes:02d}:{seconds:02d}'
+    return f'{minutes}:{seconds:02d}'
+
+class Progress:
+    """ Tracks the progress and throughput of a transfer.
+
+    Call advance() as bytes are sent. The callback is then invoked with this
+    object at most once every interval seconds, plus once when the transfer
+    completes, so reporting progress doesn't slow down the transfer itself.
+
+    Attributes:
+        total(int): The total number of bytes to send
+        sent(int): The number of bytes sent so far
+        callback: Called with this object to report progress
+        interval(float): The minimum time between callbacks, in seconds
+    """
+
+    def __init__(
+            self,
+            total:int,
+            callback=None,
+            interval:float = DEFAULT_INTERVAL
+        ) -> None:
+        self.total = total
+        self.sent = 0
+        self.callback = callback
+        self.interval = interval
+        self.started = time.monotonic()
+        self._rate = 0.0
+        self._last_time = self.started
+        self._last_sent = 0
+
+    @property
+    def fraction(self) -> float:
+        """float: The fraction of the transfer completed, from 0 to 1."""
+        if not self.total:
+            return 1.0
+        return min(1.0, self.sent / self.total)
+
+    @property
+    def elapsed(self) -> float:
+        """float: Seconds since the transfer started."""
+        return time.monotonic() - self.started
+
+    @property
+    def average_rate(self) -> float:
+        """float: The average throughput so far, in bytes per second."""
+        elapsed = self.elapsed
+        if not elapsed:
+            return 0.0
+        return self.sent / elapsed
+
+    @property
+    def rate(self) -> float:
+        """float: The recent throughput, in bytes per second."""
+        return self._rate or self.average_rate
+
+    @property
+    def eta(self) -> float:
+        """float: Estimated seconds until the transfer completes."""
+        rate = self.rate
+        if not rate:
+            return 0.0
+        return (self.total - self.sent) / rate
+
+    def advance(self, sent:int) -> None:
+        """ Record that more bytes have been sent.
+
+        Arguments:
+            sent - The number of bytes sent since the last call
+        """
+        self.sent += sent
+        now = time.monotonic()
+        since_last = now - self._last_time
+        done = self.sent >= self.total
+        if since_last < self.interval and not done:
+            return
+
+        if since_last:
+            rate = (self.sent - self._last_sent) / since_last
+            if self._rate:
+                rate = RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self._rate
+            self._rate = rate
+        self._last_time = now
+        self._last_sent = self.sent
+
+        if self.callback:
+            self.callback(self)
+
+    def describe(self) -> str:
+        """ A one-line description of the progress, for display."""
+        text = (
+            f'{self.fraction:4.0%}  {format_size(self.sent)} of '
+            f'{format_size(self.total)}  {format_size(self.rate)}/s'
+        )
+        if self.sent < self.total:
+            text += f'  ETA {format_duration(self.eta)}'
+        return text
+
+class ProgressLine:
+    """ Shows the progress of several transfers on one line of a terminal.
+
+    Transfers can report their progress from several threads at once. Each
+    report redraws a single status line, either for the one transfer in
+    progress or totalled over all of them, so that their output doesn't get
+    mixed up. Anything else printed while transfers are in progress should go
+    through finish(), so that it appears above the status line.
+
+    Attributes:
+        file: Where to show the status line (default is sys.stderr)
+    """
+
+    def __init__(self, file=None) -> None:
+        self.file = file or sys.stderr
+        self._transfers:dict = {}
+        self._lock = threading.Lock()
+
+    def update(self, name:str, progress:Progress) -> None:
+        """ Show the latest progress of a transfer.
+
+        This can be used as the progress_callback for run_batch().
+
+        Arguments:
+            name - The name of the transfer (e.g. the path of the file)
+            progress - Its progress
+        """
+        with self._lock:
+            self._transfers[name] = progress
+            self._draw()
+
+    def finish(self, name:str, text:str = '', file=None) -> None:
+        """ Stop showing a transfer, and print a line about it.
+
+        Arguments:
+            name - The name of the transfer, as given to update()
+            text - The line to print, if any
+            file - Where to print it (default is sys.stdout)
+        """
+        with self._lock:
+            self._transfers.pop(name, None)
+            self.file.write('\r\033[K')
+            self.file.flush()
+            if text:
+                print(text, file=file or sys.stdout, flush=True)
+            self._draw()
+
+    def describe(self) -> str:
+        """ A one-line description of the transfers in progress."""
+        if len(self._transfers) == 1:
+            name, progress = next(iter(self._transfers.items()))
+            return f'{os.path.basename(name)}: {progress.describe()}'
+        transfers = list(self._transfers.values())
+        sent = sum(progress.sent for progress in transfers)
+        total = sum(progress.total for progress in transfers)
+        rate = sum(
+            progress.rate for progress in transfers
+            if progress.sent < progress.total
+        )
+        fraction = sent / total if total else 1.0
+        return (
+            f'{len(transfers)} uploads: {fraction:4.0%}  {format_size(sent)} '
+            f'of {format_size(total)}  {format_size(rate)}/s'
+        )
+
+    def _draw(self) -> None:
+        """ Redraw the status line, with the lock held"""
+        if not self._transfers:
+            return
+        self.file.write(f'\r\033[K{self.describe()}')
+        self.file.flush()
@@ -0,0 +1,414 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+ratelimit - token buckets and adaptive limits for spacing out requests
+"""
+
+import collections
+import contextlib
+import threading
+import time
+import urllib.parse
+
+from . import config
+from .retry import MAX_RETRY_AFTER, parse_retry_after
+
+# Responses which mean the service wants fewer requests from us
+THROTTLE_STATUSES = frozenset((429, 503))
+
+# Requests allowed in flight to a service at first, and at most
+INITIAL_CONCURRENCY = 2
+MAX_CONCURRENCY = 64
+
+# How much the concurrency is cut by when the service throttles us, and
+# when its responses slow down
+THROTTLED_DECREASE = 0.5
+LATENCY_DECREASE = 0.8
+
+# Responses are taken to be slowing down once their average latency is this
+# many times the latency of requests made on their own, which is what the
+# service manages without any load from us.
+LATENCY_TOLERANCE = 2.0
+LATENCY_SMOOTHING = 0.3
+BASE_LATENCY_SMOOTHING = 0.1
+
+# A service which answers quickly can throttle us however few requests are
+# in flight, so once it has, requests are also spaced out: at first at
+# THROTTLED_DECREASE of the rate they were being sent at over the last
+# RATE_WINDOW seconds, growing by about one request per second every second
+# they're accepted. The rate is forgotten after RATE_RESET seconds without
+# being throttled.
+RATE_WINDOW = 2.0
+MIN_RATE = 0.5
+RATE_RESET = 60.0
+
+class TokenBucket:
+    """ A thread-safe token bucket.
+
+    Tokens are added at rate per second, up to burst. Taking a token when
+    the bucket is empty waits until one would have been added, so callers
+    are spaced out at the rate on average while still being allowed short
+    bursts.
+
+    Attributes:
+        rate(float): Tokens added per second
+        burst(float): The most tokens the bucket can hold
+    """
+
+    def __init__(self, rate:float, burst:float = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens:float = burst
+        self._updated:float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens:float = 1) -> float:
+        """ Take tokens from the bucket, going into debt if needed.
+
+        Returns:
+            How many seconds to wait before using the tokens
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens:float = 1):
+        """ Take tokens from the bucket, waiting until they're available."""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    def set_rate(self, rate:float):
+        """ Change the rate tokens are added at from now on."""
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def pause(self, seconds:float):
+        """ Make sure no more tokens are taken for a number of seconds."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def _refill(self):
+        """ Add the tokens due since the last update, with the lock held."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst,
+            self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+class HostRateLimiter:
+    """ A separate TokenBucket for each host.
+
+    Attributes:
+        rate(float): Requests per second allowed to each host
+        burst(float): How many requests to a host may be made at once
+    """
+
+    def __init__(self, rate:float, burst:float = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._buckets:dict = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url:str) -> TokenBucket:
+        """ Get the bucket for the host of a URL"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            try:
+                return self._buckets[host]
+            except KeyError:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = bucket
+                return bucket
+
+    def acquire(self, url:str):
+        """ Wait until a request may be made to the host of a URL"""
+        self.bucket(url).acquire()
+
+class AdaptiveLimit:
+    """ A limit on requests in flight which adjusts itself to the service.
+
+    The limit grows while responses come back quickly, by one for each
+    response at first and then by one for each limit's worth of responses.
+    When the service throttles a request (429 or 503) or its responses slow
+    down, the limit is cut by a fraction instead. Responses to requests made
+    before the last cut don't cut it again, since they were made under the
+    old limit. Being throttled also limits the rate requests are made at
+    (see RATE_WINDOW), and a Retry-After from the service holds back every
+    request until it's passed.
+
+    Attributes:
+        limit(float): Requests allowed in flight; the integer part applies
+        minimum(int): The least the limit can be cut to
+        maximum(int): The most the limit can grow to
+        in_flight(int): Requests currently in flight
+        latency(float): Moving average of seconds per response
+        base_latency(float): Moving average of seconds per response to
+            requests made on their own
+        rate(float): Requests allowed per second (0 for no limit)
+    """
+
+    def __init__(
+            self,
+            initial:int = INITIAL_CONCURRENCY,
+            minimum:int = 1,
+            maximum:int = MAX_CONCURRENCY
+        ) -> None:
+        self.limit:float = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight:int = 0
+        self.latency:float = 0
+        self.base_latency:float = 0
+        self.rate:float = 0
+        self._bucket = None
+        self._starts:collections.deque = collections.deque()
+        self._slow_start = True
+        self._decreased:float = 0
+        self._throttled:float = 0
+        self._condition = threading.Condition()
+
+    def pace(self):
+        """ Wait until the rate allows another request, if it's limited."""
+        with self._condition:
+            bucket = self._bucket
+        if bucket:
+            bucket.acquire()
+
+    def acquire(self) -> float:
+        """ Wait until another request may be made.
+
+        Returns:
+            The time.monotonic() when the request was allowed, to pass to
+            release()
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            now = time.monotonic()
+            self._starts.append(now)
+            while now - self._starts[0] > RATE_WINDOW:
+                self._starts.popleft()
+            return now
+
+    def release(
+            self,
+            started:float,
+            seconds:float = 0,
+            throttled:bool = False,
+            retry_after:float = 0
+        ):
+        """ Note that a request has finished, and adjust the limit.
+
+        Arguments:
+            started - What acquire() returned for the request
+            seconds - The latency of the response, if there was one
+            throttled - Whether the service asked us to slow down. If
+                neither this nor seconds is given, the limit is left alone.
+            retry_after - Seconds the service asked us to wait for
+        """
+        with self._condition:
+            # Only grow the limit when it's what is holding requests back
+            limited = self.in_flight >= int(self.limit)
+            alone = self.in_flight == 1
+            self.in_flight -= 1
+            if throttled:
+                self._throttle(started, retry_after)
+            elif seconds:
+                self._accepted()
+                if self.latency:
+                    self.latency += LATENCY_SMOOTHING * (
+                        seconds - self.latency
+                    )
+                    if alone:
+                        self.base_latency += BASE_LATENCY_SMOOTHING * (
+                            seconds - self.base_latency
+                        )
+                else:
+                    self.latency = self.base_latency = seconds
+                if self.latency > self.base_latency * LATENCY_TOLERANCE:
+                    self._decrease(started, LATENCY_DECREASE)
+                elif limited:
+                    step = 1 if self._slow_start else 1 / self.limit
+                    self.limit = min(self.maximum, self.limit + step)
+            self._condition.notify_all()
+
+    def _throttle(self, started:float, retry_after:float):
+        """ Slow down after being throttled, with the lock held."""
+        now = time.monotonic()
+        self._throttled = now
+        if started >= self._decreased or not self._bucket:
+            sent = len(self._starts) / RATE_WINDOW
+            rate = min(self.rate, sent) if self.rate else sent
+            self.rate = max(MIN_RATE, rate * THROTTLED_DECREASE)
+            if self._bucket:
+                self._bucket.set_rate(self.rate)
+            else:
+                self._bucket = TokenBucket(self.rate)
+            self._decrease(started, THROTTLED_DECREASE)
+        if retry_after:
+            self._bucket.pause(retry_after)
+
+    def _accepted(self):
+        """ Let the rate grow after a request is accepted, with the lock
+        held."""
+        if not self.rate:
+            return
+        if time.monotonic() - self._throttled > RATE_RESET:
+            self.rate = 0
+            self._bucket = None
+            return
+        self.rate += 1 / self.rate
+        self._bucket.set_rate(self.rate)
+
+    def _decrease(self, started:float, factor:float):
+        if started < self._decreased:
+            return
+        self._slow_start = False
+        self.limit = max(self.minimum, self.limit * factor)
+        self._decreased = time.monotonic()
+
+class Slot:
+    """ A request allowed by a RequestLimiter.
+
+    Attributes:
+        started(float): When the request was allowed
+        status(int): The status of the response, once there is one
+        seconds(float): The latency of the response, once there is one
+        retry_after(float): Seconds the service asked us to wait for
+    """
+
+    def __init__(self, started:float) -> None:
+        self.started = started
+        self.status:int = 0
+        self.seconds:float = 0
+        self.retry_after:float = 0
+
+    def finish(self, status:int, timings=None, retry_after:str = ''):
+        """ Note the response to the request.
+
+        The time spent sending the body is left out of its latency when
+        timings are given, since it depends on what was sent more than on
+        the service.
+
+        Arguments:
+            status - The status of the response
+            timings - The RequestTimings of the request, if known
+            retry_after - The Retry-After header of the response, if any
+        """
+        self.status = status
+        if retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                self.retry_after = min(seconds, MAX_RETRY_AFTER)
+        if timings and timings.total:
+            seconds = timings.latency
+        else:
+            seconds = time.monotonic() - self.started
+        self.seconds = max(seconds, 0.001)
+
+class RequestLimiter:
+    """ Keeps the requests to each service within what it will take.
+
+    Each host gets an AdaptiveLimit on the requests in flight to it and, if
+    rate is set, a TokenBucket on how often they're made.
+
+    Attributes:
+        rate(float): Requests per second allowed to each host (0 for no
+            limit)
+        burst(float): How many requests to a host may be made at once
+    """
+
+    def __init__(self, rate:float = 0, burst:float = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.rate_limiter = HostRateLimiter(rate, burst) if rate else None
+        self._limits:dict = {}
+        self._lock = threading.Lock()
+
+    def limit(self, url:str) -> AdaptiveLimit:
+        """ Get the concurrency limit for the host of a URL"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            try:
+                return self._limits[host]
+            except KeyError:
+                limit = AdaptiveLimit()
+                self._limits[host] = limit
+                return limit
+
+    @contextlib.contextmanager
+    def slot(self, url:str):
+        """ Wait until a request may be made to the host of a URL.
+
+        The caller should pass the response to finish() on the Slot given by
+        the context manager, so the limit can adjust to it.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        limit = self.limit(url)
+        limit.pace()
+        slot = Slot(limit.acquire())
+        try:
+            yield slot
+        finally:
+            limit.release(
+                slot.started,
+                slot.seconds,
+                slot.status in THROTTLE_STATUSES,
+                slot.retry_after
+            )
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter() -> RequestLimiter:
+    """ Get the RequestLimiter shared by everything in this process.
+
+    Sharing it means that separate batches (in the daemon, say) and the GUI's
+    queue all stay within what each service will take between them.
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RequestLimiter(
+                config.get('request_rate'),
+                config.get('request_burst')
+            )
+        return _limiter
@@ -38,6 +38,25 @@ from . import nullrequest
 class Remote(nullrequest.NullRequest):
    """ Class for the URL Shortener"""
 
-   def __init__(self, service_url: str = 'http://0x0.st'):
-       super().__init__(service_url=service_url)
+   def __init__(
+           self,
+           service_url: str = 'http://0x0.st',
+           transport=None,
+           retry_policy=None
+       ):
+       super().__init__(
+           service_url=service_url,
+           transport=transport,
+           retry_policy=retry_policy
+       )
        self.verb = 'url'
+
+   @property
+   def history_key(self) -> str:
+       """str: The URL, prefixed with the verb.
+
+       Shortening a URL and uploading a copy of it give different responses,
+       so the two are recorded under different keys. Shortened URLs are
+       recorded under the plain URL, as they always have been.
+       """
+       return f'{self.verb}:{self.item}'
@@ -0,0 +1,113 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+retry - retry policy with exponential backoff for requests
+"""
+
+import random
+import time
+
+# Responses which mean the service may well accept the request later
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+DEFAULT_ATTEMPTS = 4
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+MAX_RETRY_AFTER = 120.0
+
+class RetryPolicy:
+    """ How many times, and how long to wait before, retrying a request.
+
+    The wait between attempts grows exponentially and is jittered so that
+    many workers backing off at once don't all come back at the same moment.
+    A Retry-After header from the service (e.g. on 429 Too Many Requests) is
+    honoured instead when present, up to MAX_RETRY_AFTER seconds.
+
+    Attributes:
+        attempts(int): The total number of attempts, including the first
+        backoff(float): The base delay in seconds
+        max_backoff(float): The longest delay between attempts, in seconds
+    """
+
+    def __init__(
+            self,
+            attempts:int = DEFAULT_ATTEMPTS,
+            backoff:float = DEFAULT_BACKOFF,
+            max_backoff:float = DEFAULT_MAX_BACKOFF
+        ) -> None:
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(self, attempt:int, status:int = 0) -> bool:
+        """ Whether to try again after a failed attempt.
+
+        Arguments:
+            attempt - The number of the attempt which failed, starting at 1
+            status - The HTTP status of the response, or 0 if there wasn't one
+        """
+        if attempt >= self.attempts:
+            return False
+        return not status or status in RETRY_STATUSES
+
+    def delay(self, attempt:int, retry_after:str = '') -> float:
+        """ How long to wait before the next attempt, in seconds.
+
+        Arguments:
+            attempt - The number of the attempt which failed, starting at 1
+            retry_after - The Retry-After header from the response, if any
+        """
+        if retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, MAX_RETRY_AFTER)
+
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+def parse_retry_after(retry_after:str):
+    """ Parse a Retry-After header into a number of seconds from now.
+
+    Returns:
+        The number of seconds, or None if the header couldn't be parsed
+    """
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    import email.utils #pylint: disable=import-outside-toplevel
+    try:
+        when = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
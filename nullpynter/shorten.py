@@ -38,6 +38,15 @@ from . import nullrequest
 class Shorten(nullrequest.NullRequest):
    """ Class for the URL Shortener"""
 
-   def __init__(self, service_url: str = 'http://0x0.st'):
-       super().__init__(service_url=service_url)
+   def __init__(
+           self,
+           service_url: str = 'http://0x0.st',
+           transport=None,
+           retry_policy=None
+       ):
+       super().__init__(
+           service_url=service_url,
+           transport=transport,
+           retry_policy=retry_policy
+       )
        self.verb = 'shorten'
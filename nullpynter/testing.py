@@ -0,0 +1,664 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+testing - a local stand-in for a Nullpointer service
+"""
+
+import argparse
+import email.utils
+import hashlib
+import http.server
+import random
+import secrets
+import string
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+MIN_AGE_DAYS = 30
+MAX_AGE_DAYS = 365
+READ_SIZE = 64 * 1024
+
+# Form fields longer than this are rejected
+MAX_FIELD_SIZE = 64 * 1024
+
+LANDING_PAGE = """THE NULL POINTER
+================
+
+HTTP POST files here:
+    curl -F'file=@yourfile.png' {url}
+You can also POST remote URLs:
+    curl -F'url=http://example.com/image.jpg' {url}
+Or you can shorten URLs:
+    curl -F'shorten=http://example.com/some/long/url' {url}
+
+File URLs are valid for at least {min_age} days and up to a year (see below).
+Shortened URLs do not expire.
+
+Maximum file size: {max_size:.1f} MiB
+
+FILE RETENTION PERIOD
+---------------------
+
+retention = min_age + (-max_age + min_age) * pow((file_size / max_size - 1), 3)
+
+   days
+    {max_age} |  \\
+        |   \\
+        |    \\
+        |     \\
+        |      \\
+        |       \\
+        |        ..
+        |          \\
+  197.5 | ----------..-------------------------------------------
+        |             ..
+        |               \\
+        |                ..
+        |                  ...
+        |                     ..
+        |                       ...
+        |                          ....
+        |                              ......
+     {min_age} |                                    ....................
+          0                      {half_size:.1f}                      {max_size:.1f}
+                                                             MiB
+
+This is a local stand-in server for testing.
+"""
+
+def retention_days(size:int, max_size:int = DEFAULT_MAX_SIZE) -> float:
+    """ How long the service keeps a file of a given size, in days."""
+    return MIN_AGE_DAYS + (MIN_AGE_DAYS - MAX_AGE_DAYS) * (
+        size / max_size - 1
+    ) ** 3
+
+class StoredFile:
+    """ A file received by the server.
+
+    Attributes:
+        name(str): The file name the client sent
+        size(int): The size of the file, in bytes
+        digest(str): The SHA-256 of the file
+        data(bytes): The contents, if the server is storing them
+        expires(int): When the file expires, in milliseconds since the epoch
+        token(str): The management token for the file
+    """
+
+    def __init__(self, name:str = '', store:bool = True) -> None:
+        self.name = name
+        self.size = 0
+        self.data = b''
+        self.expires = 0
+        self.token = ''
+        self._hash = hashlib.sha256()
+        self._chunks:list = [] if store else None
+
+    @property
+    def digest(self) -> str:
+        """str: The SHA-256 of the file."""
+        return self._hash.hexdigest()
+
+    def write(self, chunk:bytes) -> None:
+        """ Add a chunk of the file."""
+        self.size += len(chunk)
+        self._hash.update(chunk)
+        if self._chunks is not None:
+            self._chunks.append(chunk)
+
+    def close(self) -> None:
+        """ Finish receiving the file."""
+        if self._chunks is not None:
+            self.data = b''.join(self._chunks)
+            self._chunks = []
+
+def parse_multipart(read, boundary:bytes, store:bool = True) -> dict:
+    """ Parse a multipart/form-data body as it's read.
+
+    File contents are handed to a StoredFile a chunk at a time rather than
+    being collected into one buffer, so large uploads don't need to fit in
+    memory when the server isn't storing them.
+
+    Arguments:
+        read - A function returning up to n bytes of the body, or b'' at the
+            end of it
+        boundary - The multipart boundary
+        store - Whether to keep the contents of files
+
+    Returns:
+        {name: value} for each field, where value is a str for plain fields
+        and a StoredFile for files
+    """
+    delimiter = b'\r\n--' + boundary
+    # The first boundary doesn't follow a line break, so pretend it does
+    buffer = b'\r\n'
+    fields:dict = {}
+    state = 'preamble'
+    name = ''
+    part = None
+    eof = False
+
+    while True:
+        if state == 'preamble':
+            index = buffer.find(delimiter)
+            if index >= 0:
+                buffer = buffer[index + len(delimiter):]
+                state = 'boundary'
+                continue
+            buffer = buffer[-len(delimiter):]
+        elif state == 'boundary':
+            if len(buffer) >= 2:
+                if buffer.startswith(b'--'):
+                    break
+                buffer = buffer[2:]
+                state = 'headers'
+                continue
+        elif state == 'headers':
+            index = buffer.find(b'\r\n\r\n')
+            if index >= 0:
+                name, filename = _parse_part_headers(buffer[:index])
+                buffer = buffer[index + 4:]
+                part = StoredFile(filename, store=store)
+                state = 'body'
+                continue
+            if len(buffer) > MAX_FIELD_SIZE:
+                raise ValueError('Part headers too large')
+        elif state == 'body':
+            index = buffer.find(delimiter)
+            if index >= 0:
+                part.write(buffer[:index])
+                part.close()
+                buffer = buffer[index + len(delimiter):]
+                if part.name:
+                    fields[name] = part
+                else:
+                    if part.size > MAX_FIELD_SIZE:
+                        raise ValueError(f'Field {name} too large')
+                    fields[name] = part.data.decode('UTF-8')
+                state = 'boundary'
+                continue
+            # Hold back enough to catch a delimiter split across reads
+            keep = len(delimiter) - 1
+            if len(buffer) > keep:
+                part.write(buffer[:-keep])
+                buffer = buffer[-keep:]
+
+        if eof:
+            raise ValueError('Unexpected end of multipart body')
+        chunk = read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+    return fields
+
+def _parse_part_headers(headers:bytes) -> tuple:
+    """ Get the (name, filename) from the headers of a multipart part."""
+    name = ''
+    filename = ''
+    for line in headers.decode('UTF-8').split('\r\n'):
+        header, _, value = line.partition(':')
+        if header.strip().lower() != 'content-disposition':
+            continue
+        for param in value.split(';')[1:]:
+            key, _, param_value = param.strip().partition('=')
+            param_value = param_value.strip('"')
+            if key == 'name':
+                name = param_value
+            elif key == 'filename':
+                filename = param_value or 'file'
+    return name, filename
+
+class NullpointerHandler(http.server.BaseHTTPRequestHandler):
+    """ Handles requests to a NullpointerServer."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'NullpointerStandIn'
+
+    def log_message(self, format, *args): #pylint: disable=redefined-builtin
+        if self.server.npy.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        """ Serve the landing page, a stored file or a shortened URL."""
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        """ Like GET, without the body."""
+        self._serve(head=True)
+
+    def do_POST(self):
+        """ Accept a file, a remote URL or a URL to shorten."""
+        npy = self.server.npy
+        npy.count('requests')
+        if npy.latency:
+            time.sleep(npy.latency)
+
+        if npy.is_rate_limited():
+            npy.count('rate_limited')
+            self._discard_body()
+            self._reply(429, 'Too Many Requests\n', {'Retry-After': '1'})
+            return
+        if npy.error_rate and random.random() < npy.error_rate:
+            npy.count('errors')
+            self._discard_body()
+            self._reply(503, 'Service Unavailable\n')
+            return
+
+        try:
+            fields = self._read_form()
+        except ValueError as err:
+            self.close_connection = True
+            self._reply(400, f'{err}\n')
+            return
+        if fields is None:
+            return
+
+        if 'file' in fields and isinstance(fields['file'], StoredFile):
+            self._accept_file(fields['file'])
+        elif 'url' in fields:
+            upload = StoredFile(fields['url'].rsplit('/', 1)[-1] or 'remote')
+            upload.write(fields['url'].encode('UTF-8'))
+            upload.close()
+            self._accept_file(upload)
+        elif 'shorten' in fields:
+            key = npy.new_key()
+            npy.redirects[key] = fields['shorten']
+            self._reply(200, f'{npy.url}/{key}\n')
+        else:
+            self._reply(400, '400 Bad Request\n')
+
+    def _accept_file(self, upload:StoredFile):
+        """ Store an uploaded file and reply with its URL."""
+        npy = self.server.npy
+        if upload.size > npy.max_size:
+            self._reply(413, '413 Request Entity Too Large\n')
+            return
+
+        npy.count('bytes_received', upload.size)
+        extension = ''
+        if '.' in upload.name:
+            extension = '.' + upload.name.rsplit('.', 1)[-1]
+        key = npy.new_key() + extension
+        upload.token = secrets.token_urlsafe(16)
+        upload.expires = int(
+            (time.time() + retention_days(upload.size, npy.max_size) * 86400)
+            * 1000
+        )
+        npy.files[key] = upload
+        self._reply(
+            200,
+            f'{npy.url}/{key}\n',
+            {'X-Expires': str(upload.expires), 'X-Token': upload.token}
+        )
+
+    def _serve(self, head:bool):
+        """ Reply to a GET or HEAD request."""
+        npy = self.server.npy
+        npy.count('requests')
+        key = urllib.parse.urlsplit(self.path).path.lstrip('/')
+        if not key:
+            self._serve_landing_page(head)
+        elif key in npy.redirects:
+            self._reply(
+                302, '', {'Location': npy.redirects[key]}, head=head
+            )
+        elif key in npy.files:
+            upload = npy.files[key]
+            if upload.expires < time.time() * 1000:
+                self._reply(404, '404 Not Found\n', head=head)
+                return
+            self._reply(
+                200,
+                upload.data if len(upload.data) == upload.size else b'',
+                {'Content-Length': str(upload.size)},
+                head=head
+            )
+        else:
+            self._reply(404, '404 Not Found\n', head=head)
+
+    def _serve_landing_page(self, head:bool):
+        """ Reply with the landing page, or 304 if the client has it."""
+        npy = self.server.npy
+        page = npy.landing_page().encode('UTF-8')
+        etag = '"' + hashlib.sha256(page).hexdigest()[:16] + '"'
+        last_modified = email.utils.formatdate(npy.started, usegmt=True)
+        headers = {'ETag': etag, 'Last-Modified': last_modified}
+        if self.headers.get('If-None-Match'):
+            unchanged = self.headers['If-None-Match'] == etag
+        else:
+            unchanged = self.headers.get('If-Modified-Since') == last_modified
+        if unchanged:
+            npy.count('not_modified')
+            self._reply(304, b'', headers, head=True)
+            return
+        self._reply(200, page, headers, head=head)
+
+    def _reply(self, status:int, body, headers:dict = None, head:bool = False):
+        """ Send a response."""
+        if isinstance(body, str):
+            body = body.encode('UTF-8')
+        headers = headers or {}
+        self.send_response(status)
+        if 'Content-Length' not in headers:
+            headers['Content-Length'] = str(len(body))
+        headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _body_reader(self):
+        """ Get a read(n) function for the request body."""
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            return _ChunkedReader(self.rfile).read
+        remaining = [int(self.headers.get('Content-Length', 0))]
+
+        def read(size:int) -> bytes:
+            data = self.rfile.read(min(size, remaining[0]))
+            remaining[0] -= len(data)
+            return data
+        return read
+
+    def _discard_body(self):
+        """ Read and throw away the request body."""
+        read = self._body_reader()
+        while read(READ_SIZE):
+            pass
+
+    def _read_form(self):
+        """ Read the form fields from the request body.
+
+        Returns:
+            {name: value}, or None if a response has already been sent
+        """
+        npy = self.server.npy
+        content_type = self.headers.get('Content-Type', '')
+        length = int(self.headers.get('Content-Length', 0))
+        if length > npy.max_size + MAX_FIELD_SIZE:
+            # Don't bother parsing something we would reject anyway. It's
+            # still read, so the client sees the response rather than a
+            # reset connection.
+            self._discard_body()
+            self._reply(413, '413 Request Entity Too Large\n')
+            return None
+
+        read = self._body_reader()
+        if content_type.startswith('multipart/form-data'):
+            boundary = content_type.split('boundary=', 1)[-1].strip('"')
+            return parse_multipart(read, boundary.encode(), store=npy.store)
+
+        data = b''
+        while True:
+            chunk = read(READ_SIZE)
+            if not chunk:
+                break
+            data += chunk
+            if len(data) > MAX_FIELD_SIZE:
+                raise ValueError('Form too large')
+        return dict(urllib.parse.parse_qsl(data.decode('UTF-8')))
+
+class _ChunkedReader:
+    """ Decodes a body sent with chunked transfer encoding."""
+
+    def __init__(self, rfile) -> None:
+        self.rfile = rfile
+        self.remaining = 0
+        self.done = False
+
+    def read(self, size:int) -> bytes:
+        if self.done:
+            return b''
+        if not self.remaining:
+            self.remaining = int(self.rfile.readline().split(b';')[0], 16)
+            if not self.remaining:
+                # Skip any trailers
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                self.done = True
+                return b''
+        data = self.rfile.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        if not self.remaining:
+            self.rfile.readline()
+        return data
+
+class NullpointerServer:
+    """ A local stand-in for a Nullpointer service.
+
+    It implements the same form API as 0x0.st: POST a `file`, a remote `url`
+    or a URL to `shorten` and get a URL back as plain text, with X-Expires
+    and X-Token headers for files. Latency, error rates, rate limits and the
+    size limit can be set so clients can be tested and measured offline:
+
+        with NullpointerServer(latency=0.05, error_rate=0.1) as server:
+            Upload(service_url=server.url)...
+
+    It can also be run as a separate process; see spawn().
+
+    Attributes:
+        latency(float): Seconds to wait before handling each POST
+        error_rate(float): Fraction of POSTs answered with 503 (0-1)
+        rate_limit(float): POSTs per second allowed before answering 429
+            (0 for no limit)
+        max_size(int): The largest file accepted, in bytes
+        store(bool): Whether to keep the contents of uploaded files. Without
+            them, files are still hashed and counted.
+        verbose(bool): Whether to log each request to stderr
+        files(dict): The uploaded files, by key
+        redirects(dict): The shortened URLs, by key
+        stats(dict): Counts of requests, errors and bytes received
+        started(float): When the server was created, which is also when
+            the landing page was last modified
+    """
+
+    def __init__(
+            self,
+            host:str = '127.0.0.1',
+            port:int = 0,
+            latency:float = 0.0,
+            error_rate:float = 0.0,
+            rate_limit:float = 0.0,
+            max_size:int = DEFAULT_MAX_SIZE,
+            store:bool = True,
+            verbose:bool = False
+        ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.max_size = max_size
+        self.store = store
+        self.verbose = verbose
+        self.files:dict = {}
+        self.redirects:dict = {}
+        self.stats:dict = {}
+        self._lock = threading.Lock()
+        self._next_key = 0
+        self._allowance = rate_limit
+        self._allowance_time = time.monotonic()
+        self._thread = None
+        self.started = time.time()
+
+        self.httpd = http.server.ThreadingHTTPServer(
+            (host, port), NullpointerHandler
+        )
+        self.httpd.daemon_threads = True
+        self.httpd.npy = self
+
+    @property
+    def url(self) -> str:
+        """str: The URL of the server."""
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'NullpointerServer':
+        """ Start serving in a background thread."""
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """ Stop serving and close the socket."""
+        if self._thread:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def serve_forever(self) -> None:
+        """ Serve in the current thread until interrupted."""
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def landing_page(self) -> str:
+        """ The text served at the root of the service."""
+        max_size = self.max_size / 1024 / 1024
+        return LANDING_PAGE.format(
+            url=self.url,
+            min_age=MIN_AGE_DAYS,
+            max_age=MAX_AGE_DAYS,
+            max_size=max_size,
+            half_size=max_size / 2
+        )
+
+    def count(self, stat:str, amount:int = 1) -> None:
+        """ Add to one of the stats."""
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + amount
+
+    def new_key(self) -> str:
+        """ Get a new, unique short key for a file or URL."""
+        alphabet = string.digits + string.ascii_letters
+        with self._lock:
+            number = self._next_key
+            self._next_key += 1
+        key = ''
+        while True:
+            number, digit = divmod(number, len(alphabet))
+            key = alphabet[digit] + key
+            if not number:
+                return key.rjust(3, '0')
+
+    def is_rate_limited(self) -> bool:
+        """ Whether the current request is over the rate limit.
+
+        Requests are allowed at rate_limit per second, with bursts of up to
+        rate_limit requests.
+        """
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(
+                self.rate_limit,
+                self._allowance + (now - self._allowance_time) * self.rate_limit
+            )
+            self._allowance_time = now
+            if self._allowance < 1:
+                return True
+            self._allowance -= 1
+            return False
+
+def spawn(**options) -> tuple:
+    """ Run a NullpointerServer in a separate process.
+
+    Arguments:
+        Any of the options accepted by the command line (e.g. latency=0.05,
+        error_rate=0.1, max_size=1024, no_store=True).
+
+    Returns:
+        (process:subprocess.Popen, url:str). Terminate the process when done.
+    """
+    command = [sys.executable, '-m', 'nullpynter.testing', '--port', '0']
+    for option, value in options.items():
+        option = '--' + option.replace('_', '-')
+        if value is True:
+            command.append(option)
+        elif value is not False:
+            command += [option, str(value)]
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, text=True
+    )
+    url = process.stdout.readline().strip()
+    if not url:
+        process.wait()
+        raise RuntimeError('The stand-in server failed to start')
+    return process, url
+
+def main(argv:list = None):
+    """ Run a stand-in server from the command line."""
+    parser = argparse.ArgumentParser(
+        prog='python -m nullpynter.testing',
+        description='Run a local stand-in for a Nullpointer service'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0)
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE)
+    parser.add_argument('--no-store', action='store_true')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    server = NullpointerServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        max_size=args.max_size,
+        store=not args.no_store,
+        verbose=args.verbose
+    )
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
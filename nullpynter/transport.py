@@ -0,0 +1,295 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+transport - the shared HTTP transport used to talk to the service
+"""
+
+import threading
+import time
+
+DEFAULT_MAXSIZE = 4
+DEFAULT_NUM_POOLS = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 300.0
+DEFAULT_REDIRECTS = 3
+
+class TransportError(Exception):
+    """ The service couldn't be reached, or the connection failed."""
+
+class RequestTimings:
+    """ Where the time went in a request, in seconds.
+
+    If the request was redirected or its connection was retried, the times
+    for each attempt are added together.
+
+    Attributes:
+        connect(float): Looking up the host and opening the TCP connection
+        tls(float): The TLS handshake
+        send(float): Sending the request headers and body
+        wait(float): Waiting for the response headers
+        total(float): The whole request, from start to response headers
+        bytes_sent(int): Bytes written to the connection, including headers
+    """
+    PHASES = ('connect', 'tls', 'send', 'wait')
+
+    def __init__(self) -> None:
+        self.connect:float = 0
+        self.tls:float = 0
+        self.send:float = 0
+        self.wait:float = 0
+        self.total:float = 0
+        self.bytes_sent:int = 0
+
+    @property
+    def reused(self) -> bool:
+        """bool: Whether a kept-alive connection was used."""
+        return not (self.connect or self.tls)
+
+    @property
+    def latency(self) -> float:
+        """float: The time taken apart from sending the request.
+
+        This depends on the service and the network rather than on the size
+        of what was sent.
+        """
+        return max(self.total - self.send, 0)
+
+    def as_dict(self) -> dict:
+        return {
+            phase: getattr(self, phase)
+            for phase in self.PHASES + ('total', 'bytes_sent')
+        }
+
+# The timings for the request being made by each thread
+_local = threading.local()
+
+class Transport:
+    """ A lazily-created, configurable urllib3 connection pool.
+
+    The underlying PoolManager isn't built (and urllib3 isn't imported) until
+    the first request is made. Connections are kept alive between requests,
+    so everything sharing a Transport shares connections to the service.
+
+    Attributes:
+        maxsize(int): The number of connections to keep per host
+        num_pools(int): The number of hosts to keep connection pools for
+        block(bool): Whether to wait for a free connection when all maxsize
+            connections to a host are in use, rather than opening another
+        connect_timeout(float): Seconds to wait for a connection
+        read_timeout(float): Seconds to wait for data from the service
+        redirects(int): How many redirects to follow
+    """
+
+    def __init__(
+            self,
+            maxsize:int = DEFAULT_MAXSIZE,
+            num_pools:int = DEFAULT_NUM_POOLS,
+            block:bool = False,
+            connect_timeout:float = DEFAULT_CONNECT_TIMEOUT,
+            read_timeout:float = DEFAULT_READ_TIMEOUT,
+            redirects:int = DEFAULT_REDIRECTS
+        ) -> None:
+        self.maxsize = maxsize
+        self.num_pools = num_pools
+        self.block = block
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.redirects = redirects
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """urllib3.PoolManager: The connection pool, created on first use."""
+        with self._lock:
+            if not self._pool:
+                self._pool = self._make_pool()
+            return self._pool
+
+    def request(self, method:str, url:str, **kwargs):
+        """ Make a request using the connection pool.
+
+        Takes the same arguments as urllib3.PoolManager.request().
+
+        Returns:
+            The urllib3 response, with a RequestTimings as its timings
+            attribute
+
+        Raises:
+            TransportError if the request couldn't be completed
+        """
+        pool = self.pool
+        import urllib3 #pylint: disable=import-outside-toplevel
+        timings = RequestTimings()
+        _local.timings = timings
+        start = time.perf_counter()
+        try:
+            response = pool.request(method, url, **kwargs)
+        except (urllib3.exceptions.HTTPError, OSError) as err:
+            raise TransportError(str(err)) from err
+        finally:
+            timings.total = time.perf_counter() - start
+            _local.timings = None
+        response.timings = timings
+        return response
+
+    def clear(self):
+        """ Close all of the connections in the pool."""
+        with self._lock:
+            if self._pool:
+                self._pool.clear()
+
+    def _make_pool(self):
+        """ Build the urllib3 PoolManager for this transport."""
+        import urllib3 #pylint: disable=import-outside-toplevel
+
+        # Nothing is retried here: RetryPolicy decides what to retry, and
+        # how often, for every request. Retrying connections here as well
+        # would multiply its attempts (and connect timeouts) behind its back.
+        retries = urllib3.Retry(
+            total=None,
+            connect=0,
+            read=0,
+            other=0,
+            redirect=self.redirects,
+            status=0,
+            raise_on_status=False
+        )
+        pool = urllib3.PoolManager(
+            num_pools=self.num_pools,
+            maxsize=self.maxsize,
+            block=self.block,
+            timeout=urllib3.Timeout(
+                connect=self.connect_timeout,
+                read=self.read_timeout
+            ),
+            retries=retries
+        )
+        pool.pool_classes_by_scheme = _timed_pool_classes(urllib3)
+        return pool
+
+_pool_classes:dict = {}
+
+def _timed_pool_classes(urllib3) -> dict:
+    """ Build connection pool classes which fill in RequestTimings.
+
+    The connections time each step of a request and add it to the timings
+    for the current thread, if there are any.
+    """
+    if _pool_classes:
+        return _pool_classes
+
+    class TimedConnectionMixin:
+        """ Timing for urllib3 connections"""
+        #pylint: disable=no-member
+
+        def _new_conn(self):
+            timings = getattr(_local, 'timings', None)
+            start = time.perf_counter()
+            try:
+                return super()._new_conn()
+            finally:
+                if timings:
+                    timings.connect += time.perf_counter() - start
+
+        def request(self, *args, **kwargs):
+            timings = getattr(_local, 'timings', None)
+            if not timings:
+                return super().request(*args, **kwargs)
+            start = time.perf_counter()
+            connecting = timings.connect + timings.tls
+            try:
+                return super().request(*args, **kwargs)
+            finally:
+                # Plain HTTP connections connect when they first send
+                elapsed = time.perf_counter() - start
+                timings.send += elapsed - (
+                    timings.connect + timings.tls - connecting
+                )
+
+        def send(self, data):
+            timings = getattr(_local, 'timings', None)
+            if timings:
+                timings.bytes_sent += len(data)
+            return super().send(data)
+
+        def getresponse(self, *args, **kwargs):
+            timings = getattr(_local, 'timings', None)
+            start = time.perf_counter()
+            try:
+                return super().getresponse(*args, **kwargs)
+            finally:
+                if timings:
+                    timings.wait += time.perf_counter() - start
+
+    class TimedHTTPConnection(
+            TimedConnectionMixin, urllib3.connection.HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(
+            TimedConnectionMixin, urllib3.connection.HTTPSConnection):
+
+        def connect(self):
+            timings = getattr(_local, 'timings', None)
+            if not timings:
+                return super().connect()
+            start = time.perf_counter()
+            connect = timings.connect
+            try:
+                return super().connect()
+            finally:
+                # Whatever wasn't the TCP connection (in _new_conn) was TLS
+                elapsed = time.perf_counter() - start
+                timings.tls += elapsed - (timings.connect - connect)
+
+    class TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    _pool_classes.update({
+        'http': TimedHTTPConnectionPool,
+        'https': TimedHTTPSConnectionPool,
+    })
+    return _pool_classes
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+def get_transport() -> Transport:
+    """ Get the Transport shared by everything in this process by default."""
+    global _default_transport
+    with _default_transport_lock:
+        if not _default_transport:
+            _default_transport = Transport()
+        return _default_transport
@@ -33,26 +33,81 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 upload - class for the file uploader
 """
 
+import os
+
 from . import nullrequest
+from .digest import get_hash_cache
+from .info import get_info_cache
+from .multipart import MultipartEncoder
+from .profiling import span
+from .progress import Progress
 
 class Upload(nullrequest.NullRequest):
-    """ Class for the URL Shortener"""
+    """ Class for the file uploader"""
 
-    def __init__(self, service_url: str = 'http://0x0.st'):
-        super().__init__(service_url=service_url)
+    def __init__(
+            self,
+            service_url: str = 'http://0x0.st',
+            transport=None,
+            retry_policy=None
+        ):
+        super().__init__(
+            service_url=service_url,
+            transport=transport,
+            retry_policy=retry_policy
+        )
         self.verb = 'file'
+        self._digest: str = ''
+
+    @property
+    def history_key(self) -> str:
+        """str: The content digest of the file.
+
+        Uploads are recorded in the history by what is in the file rather than
+        where it is, so the same file under a different path is not uploaded
+        again and a changed file at the same path is.
+        """
+        if not self._digest:
+            self._digest = get_hash_cache().digest(self.item)
+        return self._digest
+
+    @property
+    def item_size(self) -> int:
+        """int: The size of the file, in bytes."""
+        return os.path.getsize(self.item)
 
     def set_request_params(self, data):
         """ Sets up the request parameters
-        
-        We need to turn this into file data before we set up the request
 
         Arguments:
             data(str): The filename to upload
         """
-        with open(data, mode='rb') as upload_file:
-            file_data = upload_file.read()
-        
-        request_param = (data, file_data)
-        super().set_request_params(request_param)
-        self.item = data
+        super().set_request_params(data)
+        self._digest = ''
+
+    def check_request(self):
+        """ Make sure the file isn't larger than the service allows.
+
+        The limit comes from the service's landing page, which is cached, so
+        this rarely costs a request of its own.
+
+        Raises:
+            FileTooLarge if the file is too large
+        """
+        limits = get_info_cache().limits(
+            self.service_url, self.transport
+        )
+        limits.check_size(self.item_size)
+
+    def _request(self):
+        """ Stream the file to the service as a multipart/form-data body."""
+        with span('request.encode'):
+            body = MultipartEncoder(self.verb, self.item)
+        if self.progress_callback:
+            body.progress = Progress(len(body), callback=self.progress_callback)
+        return self.transport.request(
+            'POST',
+            self.service_url,
+            body=body,
+            headers=body.headers
+        )
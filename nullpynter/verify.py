@@ -0,0 +1,148 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+verify - check that responses in the history still exist on the service
+"""
+
+import time
+
+from .history import get_history
+from .ratelimit import HostRateLimiter
+from .transport import Transport, TransportError
+
+DEFAULT_JOBS = 8
+
+# HEAD requests per second (and at once) allowed to each host
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 5
+
+# Entries verified within this many seconds aren't checked again
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+# Responses meaning the item is gone for good. Anything else that isn't a
+# success or redirect (e.g. 429 or 503) says nothing about the item.
+DEAD_STATUSES = {404, 410, 451}
+
+def check_response(response:str, transport) -> tuple:
+    """ HEAD a response URL to see whether it still exists.
+
+    Redirects aren't followed, since a shortened URL which redirects is alive
+    whether or not its target is.
+
+    Arguments:
+        response - The shortened/uploaded URL
+        transport - The Transport to send the request with
+
+    Returns:
+        (alive:bool, detail:str). alive is None if it couldn't be told.
+    """
+    try:
+        request = transport.request('HEAD', response, redirect=False)
+    except TransportError as err:
+        return None, str(err)
+    status = request.status
+    if status in DEAD_STATUSES:
+        return False, str(status)
+    if status < 400:
+        return True, str(status)
+    return None, str(status)
+
+def verify_history(
+        history=None,
+        url:str = '',
+        jobs:int = DEFAULT_JOBS,
+        rate:float = DEFAULT_RATE,
+        burst:float = DEFAULT_BURST,
+        max_age:float = DEFAULT_MAX_AGE,
+        transport=None
+    ):
+    """ Check that the responses in the history still exist.
+
+    Responses are checked concurrently by a pool of workers, with requests
+    to each host limited to rate per second. Dead entries are removed from
+    the history, and live ones are marked as verified so they're skipped
+    for max_age seconds. Entries which couldn't be checked are left alone.
+
+    Arguments:
+        history - The NpyHistory to check (default is the shared one)
+        url - Only check entries for this service (default is all)
+        jobs - The maximum number of requests in flight at once
+        rate - Requests per second allowed to each host
+        burst - Requests which may be made to a host at once
+        max_age - Skip entries verified within this many seconds
+        transport - The Transport to use (default is a new one)
+
+    Yields:
+        (response:str, alive:bool, detail:str) for each entry checked, as the
+        checks complete. alive is None if it couldn't be told.
+    """
+    #pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    history = history or get_history()
+    jobs = max(1, jobs)
+    if not transport:
+        transport = Transport(maxsize=jobs)
+    limiter = HostRateLimiter(rate, burst)
+    started = time.time()
+    entries = history.unverified(started - max_age, url=url)
+
+    def check(response):
+        limiter.acquire(response)
+        return check_response(response, transport)
+
+    alive:list = []
+    dead:list = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(check, response): response
+                for service_url, item, response in entries
+            }
+            try:
+                for future in as_completed(futures):
+                    response = futures[future]
+                    is_alive, detail = future.result()
+                    if is_alive:
+                        alive.append(response)
+                    elif is_alive is False:
+                        dead.append(response)
+                    yield response, is_alive, detail
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        # Record what was found even if the caller stopped early
+        if alive:
+            history.mark_verified(alive, when=started)
+        if dead:
+            history.forget(dead)
@@ -0,0 +1,68 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+conftest - shared fixtures for the tests
+"""
+
+import pytest
+
+from nullpynter import config, digest, info, metrics, ratelimit
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    """ Give each test its own home directory, and fresh shared objects.
+
+    Everything nullpynter keeps on disk (config, history, journal, caches)
+    lives under the home directory, so tests can't see each other's data or
+    the user's.
+    """
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.delenv('XDG_CONFIG_HOME', raising=False)
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.delenv('NPY_PROFILE', raising=False)
+    monkeypatch.setattr(config, '_config', {})
+    monkeypatch.setattr(digest, '_hash_cache', None)
+    monkeypatch.setattr(info, '_info_cache', None)
+    monkeypatch.setattr(metrics, '_metrics', None)
+    monkeypatch.setattr(ratelimit, '_limiter', None)
+    yield tmp_path
+    if metrics._metrics:
+        metrics._metrics.flush()
+
+@pytest.fixture
+def server():
+    """ A NullpointerServer to send requests to."""
+    pytest.importorskip('urllib3')
+    #pylint: disable=import-outside-toplevel
+    from nullpynter.testing import NullpointerServer
+    with NullpointerServer() as npy_server:
+        yield npy_server
@@ -0,0 +1,92 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_aio - AsyncClient against NullpointerServer
+"""
+
+import asyncio
+
+import pytest
+
+from nullpynter.aio import AsyncClient
+from nullpynter.info import FileTooLarge
+from nullpynter.testing import NullpointerServer
+
+def test_sends_concurrently(server, tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f'{i}.txt'
+        path.write_bytes(f'File {i}\n'.encode('UTF-8'))
+        paths.append(str(path))
+
+    async def send():
+        async with AsyncClient(server.url, limit=2) as client:
+            return await asyncio.gather(
+                *(client.upload(path) for path in paths),
+                client.shorten('https://example.com/a/long/path')
+            )
+    responses = asyncio.run(send())
+
+    assert len(set(responses)) == 5
+    for i, response in enumerate(responses[:4]):
+        stored = server.files[response.rsplit('/', 1)[-1]]
+        assert stored.data == f'File {i}\n'.encode('UTF-8')
+    key = responses[4].rsplit('/', 1)[-1]
+    assert server.redirects[key] == 'https://example.com/a/long/path'
+
+def test_upload_is_remembered(server, tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'Hello, world\n')
+
+    async def send():
+        async with AsyncClient(server.url) as client:
+            first = await client.upload(str(path))
+            requests = server.stats['requests']
+            assert await client.upload(str(path)) == first
+            assert server.stats['requests'] == requests
+    asyncio.run(send())
+
+def test_upload_too_large(tmp_path):
+    pytest.importorskip('urllib3')
+    path = tmp_path / 'big.bin'
+    path.write_bytes(b'\0' * 2 * 1024 * 1024)
+
+    async def send(url):
+        async with AsyncClient(url) as client:
+            await client.upload(str(path))
+
+    with NullpointerServer(max_size=1024 * 1024) as server:
+        with pytest.raises(FileTooLarge):
+            asyncio.run(send(server.url))
+        # Only the landing page was fetched
+        assert server.stats['requests'] == 1
+        assert not server.files
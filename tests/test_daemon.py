@@ -0,0 +1,88 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_daemon - forwarding batches to an npy daemon
+"""
+
+import socket
+import threading
+
+import pytest
+
+from nullpynter.daemon import NpyDaemon, forward
+
+def test_forwards_batch(server, tmp_path):
+    daemon = NpyDaemon(tmp_path / 'npy.sock')
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    try:
+        results = list(forward({
+            'action': 'shorten',
+            'items': ['https://example.com/a', 'https://example.com/b'],
+            'url': server.url,
+            'ordered': True,
+        }, daemon.socket_path))
+    finally:
+        daemon.shutdown()
+        thread.join()
+        daemon.server_close()
+
+    assert [item for item, response, error in results] == [
+        'https://example.com/a', 'https://example.com/b'
+    ]
+    for item, response, error in results:
+        assert not error
+        assert server.redirects[response.rsplit('/', 1)[-1]] == item
+
+def test_no_daemon(tmp_path):
+    assert forward({'action': 'shorten'}, tmp_path / 'npy.sock') is None
+
+def test_daemon_going_away(tmp_path):
+    socket_path = tmp_path / 'npy.sock'
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(socket_path))
+    listener.listen()
+
+    def reply_and_die():
+        connection = listener.accept()[0]
+        with connection, connection.makefile('rwb') as stream:
+            stream.readline()
+            stream.write(b'{"item": "a", "response": "http://0x0.st/a", ')
+    thread = threading.Thread(target=reply_and_die)
+    thread.start()
+    try:
+        results = forward({'action': 'shorten', 'items': ['a']}, socket_path)
+        with pytest.raises(ConnectionError):
+            list(results)
+    finally:
+        thread.join()
+        listener.close()
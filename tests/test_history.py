@@ -0,0 +1,160 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_history - tests for the history database
+"""
+
+import json
+import sqlite3
+import time
+
+from nullpynter.history import MIGRATIONS, SCHEMA, NpyHistory
+
+def test_migrates_old_schema(tmp_path):
+    db_path = tmp_path / 'history.db'
+    with sqlite3.connect(db_path) as db:
+        db.executescript(SCHEMA)
+        db.execute(
+            'INSERT INTO history VALUES (?, ?, ?)',
+            ('http://0x0.st', 'https://example.com', 'http://0x0.st/abc')
+        )
+    db.close()
+
+    history = NpyHistory(db_path)
+    version = history._db.execute('PRAGMA user_version').fetchone()[0]
+    assert version == len(MIGRATIONS)
+    assert history.find_response('http://0x0.st/abc') == (
+        'http://0x0.st', 'https://example.com', 'https://example.com'
+    )
+    assert history.find_item_in_history(
+        'http://0x0.st', 'https://example.com'
+    ) == 'http://0x0.st/abc'
+
+    # Opening it again doesn't migrate it twice
+    NpyHistory(db_path)
+
+def test_imports_history_file(tmp_path):
+    hist_file_path = tmp_path / 'history'
+    with open(hist_file_path, mode='w') as hist_file:
+        json.dump({'http://0x0.st': {'a.txt': 'http://0x0.st/1'}}, hist_file)
+
+    history = NpyHistory(tmp_path / 'history.db')
+    assert history.get() == {'http://0x0.st': {'a.txt': 'http://0x0.st/1'}}
+    assert not hist_file_path.exists()
+    assert hist_file_path.with_suffix('.migrated').exists()
+
+def test_expired_entries_are_dropped(tmp_path):
+    history = NpyHistory(tmp_path / 'history.db')
+    history.append('old', 'http://0x0.st', 'http://0x0.st/old', expires=1)
+    history.append(
+        'new', 'http://0x0.st', 'http://0x0.st/new', expires=time.time() + 60
+    )
+
+    assert history.find_item_in_history('http://0x0.st', 'old') == ''
+    assert history.find_item_in_history(
+        'http://0x0.st', 'new'
+    ) == 'http://0x0.st/new'
+    assert history.get() == {'http://0x0.st': {'new': 'http://0x0.st/new'}}
+    assert history.find_response('http://0x0.st/old') == ()
+
+    # The expired entry was removed when it was looked up
+    count = history._db.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+    assert count == 1
+
+def test_prune_removes_least_recently_used(tmp_path):
+    history = NpyHistory(tmp_path / 'history.db', max_entries=2)
+    for name in ('a', 'b', 'c'):
+        history.append(name, 'http://0x0.st', f'http://0x0.st/{name}')
+    with history._write():
+        history._db.execute("UPDATE history SET used = 1 WHERE item = 'b'")
+
+    assert history.prune() == 1
+    assert history.get() == {
+        'http://0x0.st': {'a': 'http://0x0.st/a', 'c': 'http://0x0.st/c'}
+    }
+
+def test_sees_changes_from_other_connections(tmp_path):
+    history = NpyHistory(tmp_path / 'history.db')
+    other = NpyHistory(tmp_path / 'history.db')
+    assert history.find_item_in_history('http://0x0.st', 'a') == ''
+
+    other.append('a', 'http://0x0.st', 'http://0x0.st/a')
+    assert history.find_item_in_history(
+        'http://0x0.st', 'a'
+    ) == 'http://0x0.st/a'
+
+    other.forget(['http://0x0.st/a'])
+    assert history.find_item_in_history('http://0x0.st', 'a') == ''
+
+def test_own_changes_keep_cache(tmp_path):
+    history = NpyHistory(tmp_path / 'history.db')
+    history.append('a', 'http://0x0.st', 'http://0x0.st/a')
+    assert history.find_item_in_history(
+        'http://0x0.st', 'a'
+    ) == 'http://0x0.st/a'
+
+    history.append('b', 'http://0x0.st', 'http://0x0.st/b')
+    history.find_item_in_history('http://0x0.st', 'b')
+    assert ('http://0x0.st', 'a') in history._cache
+
+def test_digest_lookups_mark_digests_used(tmp_path):
+    history = NpyHistory(tmp_path / 'history.db')
+    history.set_digest(1, 1, 10, 100, 'sha256:a')
+    with history._write():
+        history._db.execute('UPDATE digests SET used = 1')
+
+    assert history.get_digest(1, 1, 10, 100) == 'sha256:a'
+    used = history._db.execute('SELECT used FROM digests').fetchone()[0]
+    assert used > 1
+
+def test_cached_lookups_mark_entries_used(tmp_path):
+    history = NpyHistory(tmp_path / 'history.db')
+    history.append('a', 'http://0x0.st', 'http://0x0.st/a')
+    with history._write():
+        history._db.execute('UPDATE history SET used = 1')
+    history._cache[('http://0x0.st', 'a')] = ('http://0x0.st/a', 0, 1)
+
+    for _ in range(5):
+        history.find_item_in_history('http://0x0.st', 'a')
+    used = history._db.execute('SELECT used FROM history').fetchone()[0]
+    assert used > 1
+
+def test_lookup_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr('nullpynter.history.MAX_CACHED', 10)
+    history = NpyHistory(tmp_path / 'history.db')
+    history.append('a', 'http://0x0.st', 'http://0x0.st/a')
+    for i in range(100):
+        history.find_item_in_history('http://0x0.st', f'missing-{i}')
+        history.find_item_in_history('http://0x0.st', 'a')
+
+    assert len(history._cache) == 10
+    assert ('http://0x0.st', 'a') in history._cache
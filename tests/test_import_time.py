@@ -0,0 +1,63 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_import_time - trivial npy invocations must stay cheap to start
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from nullpynter.bench import TRIVIAL_COMMANDS, bench_import_time
+
+ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.fixture(scope='module')
+def import_times():
+    """ What each trivial command imports, from `python -X importtime`."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # Make sure npy imports this tree rather than an installed copy
+        python_path = os.environ.get('PYTHONPATH', '')
+        monkeypatch.setenv(
+            'PYTHONPATH',
+            os.pathsep.join(filter(None, [str(ROOT), python_path]))
+        )
+        return bench_import_time()
+
+@pytest.mark.parametrize(
+    'command', [' '.join(arguments) for arguments in TRIVIAL_COMMANDS]
+)
+def test_no_heavy_imports(import_times, command):
+    result = import_times[command]
+    assert result['modules'], 'npy did not run'
+    assert result['heavy_modules'] == []
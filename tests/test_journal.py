@@ -0,0 +1,103 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_journal - recording and replaying failed requests
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from nullpynter.journal import JOURNALFILE, FailureJournal
+
+def record(journal:FailureJournal, *items):
+    for item in items:
+        journal.record('shorten', item, 'http://0x0.st', '503 Unavailable')
+
+def items(entries:list) -> list:
+    return [entry['item'] for entry in entries]
+
+def test_replay_takes_done_items_out():
+    journal = FailureJournal()
+    record(journal, 'a', 'b', 'c')
+
+    with journal.replay() as replay:
+        assert items(replay.entries) == ['a', 'b', 'c']
+        # The journal is free for new failures in the meantime
+        assert journal.get() == []
+        replay.done('shorten', 'a')
+        replay.done('shorten', 'b')
+        record(journal, 'b')
+
+    assert items(journal.get()) == ['b', 'c']
+
+def test_interrupted_replay_keeps_items():
+    journal = FailureJournal()
+    record(journal, 'a', 'b')
+
+    with pytest.raises(KeyboardInterrupt):
+        with journal.replay() as replay:
+            replay.done('shorten', 'a')
+            raise KeyboardInterrupt
+
+    assert items(journal.get()) == ['b']
+
+def test_replay_of_dead_process_is_recovered(home):
+    journal = FailureJournal()
+    record(journal, 'a')
+
+    # Leave behind what a replay which was killed would have taken
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    data_dir = home / '.local' / 'share' / 'nullpynter'
+    taken_path = data_dir / f'{JOURNALFILE}.{process.pid}'
+    os.rename(data_dir / JOURNALFILE, taken_path)
+    record(journal, 'b')
+
+    with journal.replay() as replay:
+        assert sorted(items(replay.entries)) == ['a', 'b']
+    assert not taken_path.exists()
+    assert sorted(items(journal.get())) == ['a', 'b']
+
+def test_replay_of_running_process_is_left_alone(home):
+    journal = FailureJournal()
+    record(journal, 'a')
+
+    with journal.replay() as replay:
+        # Another replay started meanwhile doesn't take this one's items
+        with journal.replay() as other:
+            assert other.entries == []
+        replay.done('shorten', 'a')
+
+    assert journal.get() == []
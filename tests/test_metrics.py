@@ -0,0 +1,63 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_metrics - request statistics
+"""
+
+from nullpynter.metrics import Metrics, RequestResult
+from nullpynter.transport import RequestTimings
+
+def make_result(connect:float = 0, tls:float = 0) -> RequestResult:
+    result = RequestResult('file', 'a.txt', 'http://0x0.st')
+    result.status = 200
+    result.attempts = 1
+    result.timings = RequestTimings()
+    result.timings.connect = connect
+    result.timings.tls = tls
+    result.timings.send = 0.2
+    result.timings.wait = 0.3
+    result.timings.total = connect + tls + 0.5
+    return result
+
+def test_skipped_phases_are_not_observed(tmp_path):
+    metrics = Metrics(tmp_path / 'stats.json')
+    metrics.record(make_result())
+    metrics.record(make_result(connect=0.04))
+    metrics.record(make_result(connect=0.04, tls=0.06))
+
+    latency = metrics.get()['latency']
+    assert latency['total']['count'] == 3
+    assert latency['wait']['count'] == 3
+    assert latency['connect']['count'] == 2
+    assert latency['connect']['sum'] == 0.08
+    assert latency['tls']['count'] == 1
+    assert metrics.get()['requests'] == {'file 200': 3}
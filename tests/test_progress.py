@@ -0,0 +1,60 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_progress - progress reporting
+"""
+
+import io
+
+from nullpynter.progress import Progress, ProgressLine
+
+def test_progress_line_totals_transfers():
+    status = io.StringIO()
+    output = io.StringIO()
+    line = ProgressLine(status)
+    first = Progress(1024)
+    second = Progress(3072)
+    first.advance(1024)
+    second.advance(1024)
+
+    line.update('/tmp/first', first)
+    assert status.getvalue().startswith('\r\033[Kfirst: 100%  1.0 KiB of')
+    line.update('/tmp/second', second)
+    assert '\r\033[K2 uploads:  50%  2.0 KiB of 4.0 KiB' in status.getvalue()
+    status.truncate(0)
+    status.seek(0)
+
+    # A finished transfer's line goes in place of the status line, which is
+    # then drawn again for the transfers left
+    line.finish('/tmp/first', 'done', output)
+    assert output.getvalue() == 'done\n'
+    assert status.getvalue().startswith('\r\033[K\r\033[Ksecond:  33%')
@@ -0,0 +1,124 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_ratelimit - adapting to how much the service will take
+"""
+
+import pytest
+
+from nullpynter.batch import run_batch
+from nullpynter.ratelimit import (
+    LATENCY_DECREASE,
+    MIN_RATE,
+    RATE_RESET,
+    THROTTLED_DECREASE,
+    AdaptiveLimit,
+    RequestLimiter,
+    TokenBucket,
+)
+from nullpynter.shorten import Shorten
+from nullpynter.testing import NullpointerServer
+
+def fill(limit:AdaptiveLimit) -> list:
+    """ Start as many requests as the limit allows"""
+    return [limit.acquire() for _ in range(int(limit.limit))]
+
+def test_token_bucket_spaces_out_requests():
+    bucket = TokenBucket(10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+    bucket.pause(5)
+    assert bucket.reserve() == pytest.approx(5.1, abs=0.01)
+
+def test_limit_grows_while_responses_are_quick():
+    limit = AdaptiveLimit(initial=2)
+    for _ in range(2):
+        for started in fill(limit):
+            limit.release(started, seconds=0.05)
+    # It only grows when it's what is holding requests back, i.e. once for
+    # each time it's full
+    assert limit.limit == 4
+    assert limit.rate == 0
+
+def test_limit_is_cut_when_responses_slow_down():
+    limit = AdaptiveLimit(initial=4)
+    limit.release(limit.acquire(), seconds=0.05)
+    starts = fill(limit)
+    for started in starts:
+        limit.release(started, seconds=0.5)
+    assert limit.limit == 4 * LATENCY_DECREASE
+    assert limit.rate == 0
+
+def test_throttling_cuts_limit_and_rate():
+    limit = AdaptiveLimit(initial=8)
+    starts = fill(limit)
+    limit.release(starts.pop(), throttled=True, retry_after=2)
+
+    assert limit.limit == 8 * THROTTLED_DECREASE
+    assert MIN_RATE <= limit.rate <= 8 * THROTTLED_DECREASE
+    # Retry-After holds back every request until it's passed
+    assert limit._bucket.reserve() >= 2
+
+    # Requests made before the cut don't cut the limit again
+    for started in starts:
+        limit.release(started, throttled=True)
+    assert limit.limit == 8 * THROTTLED_DECREASE
+
+def test_rate_recovers():
+    limit = AdaptiveLimit(initial=4)
+    limit.release(limit.acquire(), throttled=True)
+    rate = limit.rate
+
+    limit.release(limit.acquire(), seconds=0.05)
+    assert limit.rate == pytest.approx(rate + 1 / rate)
+
+    # Once the service has stopped throttling us for long enough, the rate
+    # isn't limited any more
+    limit._throttled -= RATE_RESET
+    limit.release(limit.acquire(), seconds=0.05)
+    assert limit.rate == 0
+    assert limit._bucket is None
+
+def test_batch_stays_within_rate_limit():
+    pytest.importorskip('urllib3')
+    items = [f'https://example.com/{i}' for i in range(40)]
+    with NullpointerServer(rate_limit=20) as server:
+        results = list(run_batch(
+            Shorten,
+            items,
+            service_url=server.url,
+            limiter=RequestLimiter()
+        ))
+    assert [error for item, response, error in results if error] == []
+    assert len(server.redirects) == len(items)
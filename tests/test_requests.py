@@ -0,0 +1,117 @@
+""" Nullpynter - The Nullpointer Uploader Service Interface
+
+BSD 3-Clause License
+
+Copyright (c) 2021, Ian Santopietro
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its
+   contributors may be used to endorse or promote products derived from
+   this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+test_requests - round trips through NullRequest against NullpointerServer
+"""
+
+import pytest
+
+from nullpynter.history import get_history
+from nullpynter.info import FileTooLarge
+from nullpynter.remote import Remote
+from nullpynter.shorten import Shorten
+from nullpynter.testing import NullpointerServer
+from nullpynter.upload import Upload
+
+def test_upload(server, tmp_path):
+    path = tmp_path / 'we"ird name.txt'
+    path.write_bytes(b'Hello, world\n')
+
+    upload = Upload(service_url=server.url)
+    upload.set_request_params(str(path))
+    response = upload.send_request()
+
+    assert response.startswith(server.url)
+    stored = server.files[response.rsplit('/', 1)[-1]]
+    assert stored.data == b'Hello, world\n'
+    assert stored.name == 'we%22ird name.txt'
+    assert upload.result.status == 200
+    assert not upload.result.cache_hit
+
+def test_upload_is_remembered(server, tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'Hello, world\n')
+    copy = tmp_path / 'b.txt'
+    copy.write_bytes(b'Hello, world\n')
+
+    first = Upload(service_url=server.url)
+    first.set_request_params(str(path))
+    response = first.send_request()
+    requests = server.stats['requests']
+
+    # The same contents under another name aren't sent again
+    second = Upload(service_url=server.url)
+    second.set_request_params(str(copy))
+    assert second.send_request() == response
+    assert second.result.cache_hit
+    assert server.stats['requests'] == requests
+
+def test_upload_too_large(tmp_path):
+    pytest.importorskip('urllib3')
+    path = tmp_path / 'big.bin'
+    path.write_bytes(b'\0' * 2 * 1024 * 1024)
+    with NullpointerServer(max_size=1024 * 1024) as server:
+        upload = Upload(service_url=server.url)
+        upload.set_request_params(str(path))
+        with pytest.raises(FileTooLarge):
+            upload.send_request()
+        # It was turned away before being sent; only the landing page was
+        # fetched
+        assert server.stats['requests'] == 1
+        assert not server.files
+
+def test_shorten(server):
+    shorten = Shorten(service_url=server.url)
+    shorten.set_request_params('https://example.com/a/long/path')
+    response = shorten.send_request()
+
+    assert response.startswith(server.url)
+    key = response.rsplit('/', 1)[-1]
+    assert server.redirects[key] == 'https://example.com/a/long/path'
+    assert get_history().find_response(response) == (
+        server.url,
+        'https://example.com/a/long/path',
+        'https://example.com/a/long/path'
+    )
+
+def test_remote_and_shorten_are_remembered_apart(server):
+    shorten = Shorten(service_url=server.url)
+    shorten.set_request_params('https://example.com/a.png')
+    shortened = shorten.send_request()
+
+    remote = Remote(service_url=server.url)
+    remote.set_request_params('https://example.com/a.png')
+    hosted = remote.send_request()
+
+    assert hosted != shortened
+    assert not remote.result.cache_hit
+    assert hosted.rsplit('/', 1)[-1] in server.files